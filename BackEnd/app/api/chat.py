@@ -1,11 +1,14 @@
 """Chat API endpoints."""
 
+import asyncio
+import json
 import logging
 from typing import Dict, List
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from ..core.rag_chain import get_rag_chain
+from ..core.rag_chain import OccamsRAGChain, get_rag_chain
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,7 +45,9 @@ class HealthResponse(BaseModel):
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest) -> ChatResponse:
+async def chat_endpoint(
+    request: ChatRequest, rag_chain: OccamsRAGChain = Depends(get_rag_chain)
+) -> ChatResponse:
     """
     Main chat endpoint that processes user questions about Occam's Advisory.
     
@@ -55,11 +60,9 @@ async def chat_endpoint(request: ChatRequest) -> ChatResponse:
     try:
         logger.info(f"Received chat request: {request.message[:100]}...")
         
-        # Get RAG chain instance
-        rag_chain = get_rag_chain()
-        
-        # Process the question
-        result = rag_chain.answer_question(request.message)
+        # Process the question off the event loop; retrieval and the Groq
+        # call are blocking
+        result = await asyncio.to_thread(rag_chain.answer_question, request.message)
         
         # Format sources
         sources = [
@@ -89,14 +92,45 @@ async def chat_endpoint(request: ChatRequest) -> ChatResponse:
         )
 
 
+@router.post("/chat/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest, rag_chain: OccamsRAGChain = Depends(get_rag_chain)
+) -> StreamingResponse:
+    """
+    Streaming variant of the chat endpoint.
+    
+    Sends server-sent events: one "token" event per chunk of the answer as
+    Groq generates it, then a final "sources" event with the citations.
+    """
+    logger.info(f"Received streaming chat request: {request.message[:100]}...")
+    
+    def event_stream():
+        try:
+            for event in rag_chain.stream_answer(request.message):
+                if event["type"] == "sources":
+                    event["conversation_id"] = request.conversation_id
+                yield f"data: {json.dumps(event)}\n\n"
+                
+        except Exception as e:
+            logger.error(f"Error in streaming chat endpoint: {str(e)}")
+            error_event = {
+                "type": "error",
+                "message": "An error occurred while processing your question. Please try again."
+            }
+            yield f"data: {json.dumps(error_event)}\n\n"
+    
+    # Starlette iterates sync generators in its threadpool, so the blocking
+    # Groq stream never stalls the event loop
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @router.get("/health", response_model=HealthResponse)
-async def health_check() -> HealthResponse:
+async def health_check(rag_chain: OccamsRAGChain = Depends(get_rag_chain)) -> HealthResponse:
     """
     Health check endpoint to verify RAG system status.
     """
     try:
-        rag_chain = get_rag_chain()
-        health_status = rag_chain.health_check()
+        health_status = await asyncio.to_thread(rag_chain.health_check)
         
         if health_status["status"] == "healthy":
             return HealthResponse(
@@ -120,13 +154,12 @@ async def health_check() -> HealthResponse:
 
 
 @router.get("/stats")
-async def get_system_stats() -> Dict:
+async def get_system_stats(rag_chain: OccamsRAGChain = Depends(get_rag_chain)) -> Dict:
     """
     Get detailed system statistics.
     """
     try:
-        rag_chain = get_rag_chain()
-        stats = rag_chain.embedding_manager.get_collection_stats()
+        stats = await asyncio.to_thread(rag_chain.embedding_manager.get_collection_stats)
         
         return {
             "system_status": "operational",
@@ -143,8 +176,58 @@ async def get_system_stats() -> Dict:
         )
 
 
+@router.get("/dashboard")
+async def get_dashboard(rag_chain: OccamsRAGChain = Depends(get_rag_chain)) -> Dict:
+    """
+    Health and system statistics in one response, so the UI sidebar needs a
+    single round-trip instead of two.
+    """
+    health, stats = await asyncio.gather(
+        health_check(rag_chain), get_system_stats(rag_chain), return_exceptions=True
+    )
+    
+    return {
+        "health": health.model_dump() if isinstance(health, HealthResponse)
+        else {"status": "unhealthy", "message": "Health check failed"},
+        "stats": stats if isinstance(stats, dict)
+        else {"error": "Failed to retrieve system statistics"}
+    }
+
+
+@router.post("/reindex")
+async def reindex_documents(rag_chain: OccamsRAGChain = Depends(get_rag_chain)) -> Dict:
+    """
+    Re-chunk scraped_data.json and upsert it into the vector database (admin endpoint).
+    
+    File reads, chunking and embedding all run in a worker thread so live
+    /chat requests keep being served while the index is rebuilt.
+    """
+    try:
+        logger.info("Reindexing scraped data...")
+        result = await asyncio.to_thread(rag_chain.reindex)
+        
+        return {
+            "message": "Reindex completed",
+            "chunks_indexed": result["chunks_indexed"],
+            "vector_database": result["vector_db_stats"]
+        }
+        
+    except FileNotFoundError as e:
+        logger.error(f"Error reindexing: {str(e)}")
+        raise HTTPException(
+            status_code=404,
+            detail="Scraped data file not found"
+        )
+    except Exception as e:
+        logger.error(f"Error reindexing: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to reindex documents"
+        )
+
+
 @router.post("/reinitialize")
-async def reinitialize_system() -> Dict:
+async def reinitialize_system(rag_chain: OccamsRAGChain = Depends(get_rag_chain)) -> Dict:
     """
     Reinitialize the RAG system (admin endpoint).
     """
@@ -152,7 +235,8 @@ async def reinitialize_system() -> Dict:
         from ..core.rag_chain import initialize_rag_system
         
         logger.info("Reinitializing RAG system...")
-        result = initialize_rag_system()
+        rag_chain.clear_cache()
+        result = await asyncio.to_thread(initialize_rag_system)
         
         return {
             "message": "System reinitialization completed",
@@ -30,12 +30,21 @@ LANGCHAIN_PROJECT = os.getenv("LANGCHAIN_PROJECT", "occams-rag-chatbot")
 
 # ChromaDB Configuration
 CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", str(DB_DIR / "chroma_db"))
+HEALTH_PROBE_PATH = DB_DIR / "health_probe.npy"  # cached embedding of the health-check query
 
 # Website Configuration
 TARGET_WEBSITE_URL = os.getenv("TARGET_WEBSITE_URL", "https://occamsadvisory.com")
 
 # Embedding Configuration
 EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx")  # "onnx" or "torch"
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+# Threads per worker for embedding; uvicorn --workers x this should not
+# exceed the physical core count, or the thread pools fight each other
+EMBEDDING_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "4"))
+# OpenMP/MKL read these when torch is first imported, so set them up front
+os.environ.setdefault("OMP_NUM_THREADS", str(EMBEDDING_NUM_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(EMBEDDING_NUM_THREADS))
 
 # LLM Configuration
 
@@ -53,13 +62,24 @@ FRONTEND_PORT = int(os.getenv("FRONTEND_PORT", "8501"))
 # Chunking Configuration
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+INGEST_BATCH_SIZE = 256  # chunks embedded per streaming batch
 
 # RAG Configuration
 TOP_K_RESULTS = 10
 SIMILARITY_THRESHOLD = 0.2
+QUERY_CACHE_SIZE = 512  # cached query embeddings / retrieval results
+ENABLE_MMR = True  # diversify retrieved chunks before building the prompt
+MMR_TOP_K = 4  # chunks kept after MMR
+MMR_LAMBDA = 0.7  # 1.0 = pure relevance, 0.0 = pure diversity
+USE_INT8_INDEX = os.getenv("USE_INT8_INDEX", "false").lower() == "true"  # needs faiss-cpu
 
 # Scraping Configuration
-SCRAPING_DELAY = 1  # seconds between requests
+SCRAPE_RATE_LIMIT = 5  # page loads per second, shared by all tabs
 MAX_PAGES_TO_SCRAPE = 50
+MIN_PAGE_CONTENT_LENGTH = 50  # pages with less cleaned text are skipped
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "10"))  # pages loaded in parallel
+PAGE_LOAD_TIMEOUT_MS = 8000  # navigation timeout; scrape whatever parsed by then
+SCRAPE_CACHE_TTL = 24 * 3600  # seconds a cached page is reused before re-scraping
+CONTEXT_RECYCLE_PAGES = 200  # relaunch the browser context after this many page loads
 
 print("Configuration loaded successfully.")
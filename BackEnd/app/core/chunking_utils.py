@@ -1,18 +1,72 @@
-"""Text chunking utilities using LangChain TextSplitters."""
+"""Text chunking utilities for the RAG pipeline."""
 
-import json
 import logging
-from typing import List, Dict
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
 from pathlib import Path
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+import ijson
+import orjson
+import xxhash
 
+from .types import Chunk
 from ..config import DATA_DIR, CHUNK_SIZE, CHUNK_OVERLAP
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Split points in priority order (same as RecursiveCharacterTextSplitter)
+_SEPARATORS = ("\n\n", "\n", ". ", " ")
+_SEP = re.compile(r"\n\n|\n|\. | ")
+
+
+def fast_split(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Split text into overlapping chunks of at most chunk_size characters.
+    
+    Each chunk ends after the highest-priority separator in the back half of
+    its window (falling back to any separator, then a hard cut), and the next
+    chunk starts at the first separator inside the overlap, or exactly
+    chunk_overlap characters back if there is none (e.g. after a hard cut
+    through text with no separators). Every lookup is a single C-level
+    str.rfind or regex search, so there is no recursion and no per-word
+    Python work.
+    """
+    chunks = []
+    start = 0
+    length = len(text)
+    
+    while start < length:
+        limit = start + chunk_size
+        
+        if limit >= length:
+            end = length
+        else:
+            end = -1
+            for window_start in (start + chunk_size // 2, start + 1):
+                for sep in _SEPARATORS:
+                    pos = text.rfind(sep, window_start, limit)
+                    if pos >= 0:
+                        end = pos + len(sep)
+                        break
+                if end >= 0:
+                    break
+            if end < 0:
+                end = limit
+        
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        
+        if end >= length:
+            break
+        
+        # Start the next chunk on a separator inside the overlap, always advancing
+        overlap_start = max(end - chunk_overlap, start + 1)
+        match = _SEP.search(text, overlap_start, end)
+        start = match.end() if match else overlap_start
+    
+    return chunks
+
 
 class DocumentChunker:
     """Handles text chunking for RAG pipeline."""
@@ -20,115 +74,111 @@ class DocumentChunker:
     def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
     
-    def load_scraped_data(self) -> List[Dict]:
-        """Load scraped data from JSON file."""
+    def iter_scraped_data(self) -> Iterator[Dict]:
+        """Stream scraped pages one at a time without loading the whole file."""
         data_file = DATA_DIR / "scraped_data.json"
         
         if not data_file.exists():
             raise FileNotFoundError(f"Scraped data file not found: {data_file}")
         
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-               
-        
-        logger.info(f"Loaded {len(data)} scraped pages")
-        return data
+        with open(data_file, 'rb') as f:
+            # use_float keeps scraped_at a float rather than Decimal
+            yield from ijson.items(f, 'item', use_float=True)
     
-    def create_documents(self, scraped_data: List[Dict]) -> List[Document]:
-        """Convert scraped data to LangChain Documents."""
-        documents = []
+    def create_document(self, item: Dict) -> Optional[Chunk]:
+        """Convert one scraped page to a whole-page Chunk, or None if too short."""
+        # Combine title and content for better context
+        content = f"Title: {item['title']}\n\n{item['content']}"
+        
+        # Skip empty content
+        if not content.strip() or len(content.strip()) < 50:
+            return None
+        
+        return Chunk(
+            text=content,
+            url=item['url'],
+            title=item['title'],
+            meta_description=item.get('meta_description', ''),
+            scraped_at=item.get('scraped_at'),
+            chunk_id='',
+            chunk_index=0,
+            total_chunks=1
+        )
     
-
-        for item in scraped_data:
-            # Combine title and content for better context
-            content = f"Title: {item['title']}\n\n{item['content']}"
-            
-            # Skip empty content
-            if not content.strip() or len(content.strip()) < 50:
-                continue
-            
-            document = Document(
-                page_content=content,
-                metadata={
-                    'url': item['url'],
-                    'title': item['title'],
-                    'meta_description': item.get('meta_description', ''),
-                    'scraped_at': item.get('scraped_at'),
-                    'source': 'occams_advisory'
-                }
+    def split_document(self, doc: Chunk) -> List[Chunk]:
+        """Split one whole-page Chunk into overlapping chunks."""
+        pieces = fast_split(doc.text, self.chunk_size, self.chunk_overlap)
+        
+        # Stable across restarts (unlike hash()), so re-ingest can upsert
+        url_hash = xxhash.xxh64_hexdigest(doc.url.encode('utf-8'))
+        
+        return [
+            Chunk(
+                text=piece,
+                url=doc.url,
+                title=doc.title,
+                meta_description=doc.meta_description,
+                scraped_at=doc.scraped_at,
+                chunk_id=f"{url_hash}_{i}",
+                chunk_index=i,
+                total_chunks=len(pieces)
             )
-            documents.append(document)
-        
-        logger.info(f"Created {len(documents)} documents")
-        return documents
+            for i, piece in enumerate(pieces)
+        ]
     
-    def chunk_documents(self, documents: List[Document]) -> List[Document]:
-        """Split documents into chunks."""
-        chunks = []
-        
-        for doc in documents:
-            # Split the document
-            doc_chunks = self.text_splitter.split_documents([doc])
-            
-            # Add chunk-specific metadata
-            for i, chunk in enumerate(doc_chunks):
-                chunk.metadata.update({
-                    'chunk_id': f"{hash(doc.metadata['url'])}_{i}",
-                    'chunk_index': i,
-                    'total_chunks': len(doc_chunks),
-                    'chunk_size': len(chunk.page_content)
-                })
-                chunks.append(chunk)
-        
-        logger.info(f"Created {len(chunks)} chunks from {len(documents)} documents")
-        return chunks
+    def iter_chunks(self) -> Iterator[Chunk]:
+        """Stream chunks page by page straight from the scraped data file.
+        
+        Only one page is held in memory at a time, so callers that consume
+        the chunks in batches keep peak memory independent of corpus size.
+        """
+        for item in self.iter_scraped_data():
+            document = self.create_document(item)
+            if document is not None:
+                yield from self.split_document(document)
     
-    def save_chunks(self, chunks: List[Document]) -> None:
+    def save_chunks(self, chunks: Iterable[Chunk]) -> None:
         """Save chunks to JSON file for inspection."""
-        chunks_data = []
-        
-        for chunk in chunks:
-            chunks_data.append({
-                'content': chunk.page_content,
-                'metadata': chunk.metadata
-            })
-        
         output_file = DATA_DIR / "chunks.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(chunks_data, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"Saved {len(chunks)} chunks to {output_file}")
+        count = 0
+        
+        # Written entry by entry so a generator of chunks is never materialized
+        with open(output_file, 'wb') as f:
+            f.write(b'[')
+            for chunk in chunks:
+                if count:
+                    f.write(b',')
+                f.write(b'\n')
+                f.write(orjson.dumps(
+                    {'content': chunk.text, 'metadata': chunk.metadata},
+                    option=orjson.OPT_INDENT_2
+                ))
+                count += 1
+            f.write(b'\n]\n')
+        
+        logger.info(f"Saved {count} chunks to {output_file}")
     
-    def process_scraped_data(self) -> List[Document]:
-        """Complete pipeline: load data -> create documents -> chunk."""
-        # Load scraped data
-        scraped_data = self.load_scraped_data()
-        
-        # Create documents
-        documents = self.create_documents(scraped_data)
+    def process_scraped_data(self) -> List[Chunk]:
+        """Complete pipeline: stream data -> create documents -> chunk.
         
-        # Chunk documents
-        chunks = self.chunk_documents(documents)
+        Returns every chunk as a list, so the whole corpus is held in memory;
+        use ``iter_chunks()`` to stream instead.
+        """
+        chunks = list(self.iter_chunks())
         
         # Save chunks for inspection
         self.save_chunks(chunks)
         
         return chunks
     
-    def get_chunk_stats(self, chunks: List[Document]) -> Dict:
+    def get_chunk_stats(self, chunks: List[Chunk]) -> Dict:
         """Get statistics about the chunks."""
         if not chunks:
             return {}
         
-        chunk_sizes = [len(chunk.page_content) for chunk in chunks]
-        unique_urls = set(chunk.metadata['url'] for chunk in chunks)
+        chunk_sizes = [len(chunk.text) for chunk in chunks]
+        unique_urls = set(chunk.url for chunk in chunks)
         
         stats = {
             'total_chunks': len(chunks),
@@ -142,7 +192,7 @@ class DocumentChunker:
         return stats
 
 
-def create_chunks_from_scraped_data() -> List[Document]:
+def create_chunks_from_scraped_data() -> List[Chunk]:
     """Main function to create chunks from scraped data."""
     chunker = DocumentChunker()
     chunks = chunker.process_scraped_data()
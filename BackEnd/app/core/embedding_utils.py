@@ -1,23 +1,73 @@
 """Embedding utilities using HuggingFace models."""
 
 import logging
-from typing import List
+import threading
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Set
+import numpy as np
 import chromadb
+from cachetools import LRUCache
+from chromadb import Documents, EmbeddingFunction, Embeddings
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
-from langchain.schema import Document
-import uuid
 
 import torch
 # print(torch.__version__)
 # print(torch.device("cuda" if torch.cuda.is_available() else "cpu"))
 
 
-from ..config import EMBEDDING_MODEL_NAME, CHROMA_DB_PATH
+from .quantized_index import QuantizedIndex
+from .types import Chunk, FloatArray
+from ..config import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, EMBEDDING_ONNX_FILE, EMBEDDING_NUM_THREADS, CHROMA_DB_PATH,
+    QUERY_CACHE_SIZE, INGEST_BATCH_SIZE, USE_INT8_INDEX, HEALTH_PROBE_PATH
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+HEALTH_PROBE_QUERY = "What is Occam's Advisory?"
+
+# Embeddings are L2-normalized, so inner product equals cosine similarity
+# and HNSW can skip the per-comparison norm computation
+COLLECTION_METADATA = {"hnsw:space": "ip"}
+
+
+class OccamsEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Chroma embedding function backed by an EmbeddingManager's model.
+    
+    Chroma's stock ONNX function is slower than our batched
+    SentenceTransformer path, so documents and queries are routed through
+    EmbeddingManager.embed_texts (and its query cache) instead.
+    """
+    
+    def __init__(self, embedding_manager: "EmbeddingManager"):
+        self.embedding_manager = embedding_manager
+    
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.embedding_manager.embed_texts(list(input))
+    
+    @staticmethod
+    def name() -> str:
+        return "occams_sentence_transformer"
+    
+    def get_config(self) -> Dict[str, Any]:
+        return {"model_name": self.embedding_manager.model_name}
+    
+    def is_legacy(self) -> bool:
+        # Chroma's default check calls build_from_config; answer directly so
+        # the collection config is stored as legacy without rebuilding
+        return True
+    
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "OccamsEmbeddingFunction":
+        # Wraps a live model, so Chroma can't rebuild it from a stored config
+        raise ValueError(
+            "OccamsEmbeddingFunction wraps a live EmbeddingManager model and can't be "
+            "rebuilt from config; pass it explicitly as embedding_function when "
+            "opening the collection"
+        )
+
 
 class EmbeddingManager:
     """Manages embeddings and vector database operations."""
@@ -25,16 +75,25 @@ class EmbeddingManager:
     def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
         self.model_name = model_name
         self.embedding_model = None
+        # Which model and backend produced the stored vectors; set on load
+        self.model_signature = model_name
         self.chroma_client = None
         self.collection = None
+        self.embedding_function = OccamsEmbeddingFunction(self)
+        self._query_embedding_cache = LRUCache(maxsize=QUERY_CACHE_SIZE)
+        self._cache_lock = threading.Lock()  # queries run in worker threads
+        self._quantized_index = None  # built lazily, dropped on every write
+        self._quantized_index_unavailable = False  # no faiss or empty collection
+        self._index_lock = threading.Lock()
+        self._health_probe_embedding = None
         self._initialize_models()
     
     def _initialize_models(self):
         """Initialize embedding model and ChromaDB client."""
         try:
             # Initialize SentenceTransformer
-            logger.info(f"Loading embedding model: {self.model_name}")
-            self.embedding_model = SentenceTransformer(self.model_name)
+            logger.info(f"Loading embedding model: {self.model_name} ({EMBEDDING_BACKEND} backend)")
+            self.embedding_model = self._load_embedding_model()
             logger.info("Embedding model loaded successfully")
             
             # Initialize ChromaDB
@@ -46,11 +105,9 @@ class EmbeddingManager:
             
             # Create or get collection
             self.collection = self.chroma_client.get_or_create_collection(
-                
-                
-                
                 name="occams_advisory",
-                metadata={"hnsw:space": "cosine"}
+                metadata=COLLECTION_METADATA,
+                embedding_function=self.embedding_function
             )
             logger.info("ChromaDB initialized successfully")
             
@@ -58,81 +115,277 @@ class EmbeddingManager:
             logger.error(f"Error initializing models: {str(e)}")
             raise
     
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    def _load_embedding_model(self) -> SentenceTransformer:
+        """Load the embedding model, preferring the INT8-quantized ONNX export."""
+        # Pin intra-op threads so several uvicorn workers don't oversubscribe the CPU
+        torch.set_num_threads(EMBEDDING_NUM_THREADS)
+        
+        if EMBEDDING_BACKEND == "onnx":
+            try:
+                import onnxruntime
+                
+                session_options = onnxruntime.SessionOptions()
+                session_options.intra_op_num_threads = EMBEDDING_NUM_THREADS
+                model = SentenceTransformer(
+                    self.model_name,
+                    backend="onnx",
+                    model_kwargs={
+                        "file_name": EMBEDDING_ONNX_FILE,
+                        "session_options": session_options
+                    }
+                )
+                self.model_signature = f"{self.model_name}:onnx:{EMBEDDING_ONNX_FILE}"
+                return model
+            except Exception as e:
+                logger.warning(f"ONNX model unavailable ({str(e)}), falling back to PyTorch")
+        
+        self.model_signature = f"{self.model_name}:torch"
+        return SentenceTransformer(self.model_name)
+    
+    def embed_texts(self, texts: List[str]) -> FloatArray:
         """Generate embeddings for a list of texts."""
+        # Single-text calls are queries; serve repeats from the cache
+        if len(texts) == 1:
+            with self._cache_lock:
+                cached = self._query_embedding_cache.get(texts[0])
+            if cached is not None:
+                return cached
+        
         try:
             embeddings = self.embedding_model.encode(
                 texts,
+                batch_size=64,
                 convert_to_numpy=True,
                 normalize_embeddings=True
             )
-            return embeddings.tolist()
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
+        
+        if len(texts) == 1:
+            with self._cache_lock:
+                self._query_embedding_cache[texts[0]] = embeddings
+        return embeddings
+    
+    def clear_cache(self):
+        """Drop cached query embeddings."""
+        with self._cache_lock:
+            self._query_embedding_cache.clear()
     
-    def embed_documents(self, documents: List[Document]) -> None:
-        """Embed documents and store in ChromaDB."""
+    def embed_documents(self, documents: List[Chunk], embeddings: Optional[FloatArray] = None) -> None:
+        """Embed documents and store in ChromaDB.
+        
+        Chroma embeds the texts through our embedding function; pass
+        precomputed ``embeddings`` to skip that for bulk ingest. Chunks
+        already stored with identical text by the same model and backend are
+        not re-embedded.
+        """
         if not documents:
             logger.warning("No documents to embed")
             return
         
-        logger.info(f"Embedding {len(documents)} documents...")
+        # Prepare columnar data for embedding in a single pass
+        texts, metadatas, ids = [], [], []
+        for chunk in documents:
+            texts.append(chunk.text)
+            metadata = chunk.metadata
+            metadata['embedding_model'] = self.model_signature
+            metadatas.append(metadata)
+            ids.append(chunk.chunk_id)
         
-        # Prepare data for embedding
-        texts = [doc.page_content for doc in documents]
-        metadatas = [doc.metadata for doc in documents]
-        ids = [str(uuid.uuid4()) for _ in documents]
+        # Chunks whose stored copy has the same content hash, embedded by the
+        # same model and backend, only need their metadata refreshed, so a
+        # re-run over unchanged data embeds nothing
+        existing = self.collection.get(ids=ids, include=['metadatas'])
+        stored_versions = {
+            chunk_id: ((metadata or {}).get('content_hash'), (metadata or {}).get('embedding_model'))
+            for chunk_id, metadata in zip(existing['ids'], existing['metadatas'])
+        }
+        changed, unchanged = [], []
+        for i, metadata in enumerate(metadatas):
+            if stored_versions.get(ids[i]) == (metadata['content_hash'], self.model_signature):
+                unchanged.append(i)
+            else:
+                changed.append(i)
         
-        # Generate embeddings in batches
-        batch_size = 100
-        for i in range(0, len(documents), batch_size):
-            batch_texts = texts[i:i + batch_size]
-            batch_metadatas = metadatas[i:i + batch_size]
-            batch_ids = ids[i:i + batch_size]
-            
-            try:
-                # Generate embeddings
-                batch_embeddings = self.embed_texts(batch_texts)
-                
-                # Store in ChromaDB
-                self.collection.add(
-                    documents=batch_texts,
-                    metadatas=batch_metadatas,
-                    ids=batch_ids,
-                    embeddings=batch_embeddings
-                )
-                
-                logger.info(f"Embedded batch {i//batch_size + 1}/{(len(documents) + batch_size - 1)//batch_size}")
-                
-            except Exception as e:
-                logger.error(f"Error embedding batch {i//batch_size + 1}: {str(e)}")
-                continue
+        if unchanged:
+            self._write_in_batches(
+                self.collection.update,
+                ids=[ids[i] for i in unchanged],
+                metadatas=[metadatas[i] for i in unchanged]
+            )
+        
+        if not changed:
+            logger.info(f"All {len(documents)} documents unchanged, nothing to embed")
+            return
+        
+        logger.info(f"Embedding {len(changed)} documents ({len(unchanged)} unchanged)...")
+        self._write_in_batches(
+            self.collection.upsert,
+            documents=[texts[i] for i in changed],
+            metadatas=[metadatas[i] for i in changed],
+            ids=[ids[i] for i in changed],
+            embeddings=embeddings[changed] if embeddings is not None else None
+        )
+        self._invalidate_quantized_index()
+        
+        logger.info(f"Successfully embedded {len(changed)} documents")
+    
+    def _write_in_batches(self, write, **columns) -> None:
+        """Call a Chroma write method, in slices if the batch is above Chroma's max size."""
+        batch_size = self.chroma_client.get_max_batch_size()
+        total = len(columns['ids'])
+        if total <= batch_size:
+            write(**columns)
+            return
+        
+        logger.info(f"Writing {total} rows in batches of {batch_size}")
+        for i in range(0, total, batch_size):
+            write(**{
+                name: values[i:i + batch_size] if values is not None else None
+                for name, values in columns.items()
+            })
+    
+    def embed_document_stream(self, documents: Iterable[Chunk], batch_size: int = INGEST_BATCH_SIZE,
+                              prune: bool = False) -> int:
+        """Embed an iterable of chunks in batches; returns the number embedded.
+        
+        With ``prune``, stored chunks that the stream didn't write (pages that
+        shrank or disappeared) are deleted once it is exhausted.
+        """
+        documents = iter(documents)
+        written_ids = set()
+        total = 0
+        while True:
+            batch = list(islice(documents, batch_size))
+            if not batch:
+                break
+            self.embed_documents(batch)
+            written_ids.update(chunk.chunk_id for chunk in batch)
+            total += len(batch)
+        
+        if prune:
+            # An empty stream most likely means missing scraped data, not an
+            # empty site; keep serving the existing collection
+            if total:
+                self.delete_stale_chunks(written_ids)
+            else:
+                logger.warning("No chunks in stream, skipping removal of stale chunks")
+        return total
+    
+    def delete_stale_chunks(self, keep_ids: Set[str]) -> int:
+        """Delete every stored chunk whose ID is not in ``keep_ids``; returns the count."""
+        stored_ids = self.collection.get(include=[])['ids']
+        stale_ids = [chunk_id for chunk_id in stored_ids if chunk_id not in keep_ids]
+        if stale_ids:
+            self._write_in_batches(self.collection.delete, ids=stale_ids)
+            self._invalidate_quantized_index()
+            logger.info(f"Deleted {len(stale_ids)} stale chunks")
+        return len(stale_ids)
+    
+    def _get_quantized_index(self) -> Optional[QuantizedIndex]:
+        """Return the int8 index, building it from the collection on first use."""
+        if not USE_INT8_INDEX:
+            return None
         
-        logger.info(f"Successfully embedded {len(documents)} documents")
+        with self._index_lock:
+            # A failed build (no faiss, nothing stored) is remembered until the
+            # next write, so queries don't each retry it
+            if self._quantized_index is None and not self._quantized_index_unavailable:
+                self._quantized_index = QuantizedIndex.from_collection(self.collection)
+                self._quantized_index_unavailable = self._quantized_index is None
+            return self._quantized_index
+    
+    def _invalidate_quantized_index(self):
+        """Drop the int8 index after a write so the next query rebuilds it."""
+        with self._index_lock:
+            self._quantized_index = None
+            self._quantized_index_unavailable = False
     
-    def similarity_search(self, query: str, top_k: int = 5) -> List[dict]:
-        """Perform similarity search in the vector database."""
+    def _quantized_search(self, index: QuantizedIndex, query: str, top_k: int,
+                          score_threshold: Optional[float] = None,
+                          include_embeddings: bool = False) -> List[dict]:
+        """Rank with the int8 index, then fetch documents and metadata from Chroma."""
+        hits = index.search(self.embed_texts([query])[0], top_k)
+        if score_threshold is not None:
+            hits = [(chunk_id, score) for chunk_id, score in hits if score >= score_threshold]
+        if not hits:
+            return []
+        
+        ids = [chunk_id for chunk_id, _ in hits]
+        include = ['documents', 'metadatas'] + (['embeddings'] if include_embeddings else [])
+        results = self.collection.get(ids=ids, include=include)
+        
+        # Chroma doesn't return rows in request order
+        rows = {chunk_id: i for i, chunk_id in enumerate(results['ids'])}
+        
+        formatted_results = []
+        for chunk_id, score in hits:
+            if chunk_id in rows:
+                row = rows[chunk_id]
+                result = {
+                    'content': results['documents'][row],
+                    'metadata': results['metadatas'][row],
+                    'score': score
+                }
+                if include_embeddings:
+                    # Chroma hands back float64; keep vectors float32
+                    result['embedding'] = np.asarray(results['embeddings'][row], dtype=np.float32)
+                formatted_results.append(result)
+        
+        return formatted_results
+    
+    def similarity_search(self, query: str, top_k: int = 5,
+                          score_threshold: Optional[float] = None,
+                          include_embeddings: bool = False) -> List[dict]:
+        """Perform similarity search in the vector database.
+        
+        Results scoring below ``score_threshold`` (if given) are dropped.
+        With ``include_embeddings`` each result also carries its stored
+        vector under ``'embedding'``.
+        """
         try:
-            # Generate query embedding
-            query_embedding = self.embed_texts([query])[0]
+            index = self._get_quantized_index()
+            if index is not None:
+                return self._quantized_search(
+                    index, query, top_k, score_threshold, include_embeddings
+                )
             
-            # Search in ChromaDB
+            # Search in ChromaDB (the query is embedded by our embedding function)
             results = self.collection.query(
-                query_embeddings=[query_embedding],
+                query_texts=[query],
                 n_results=top_k,
                 include=['documents', 'metadatas', 'distances']
+                + (['embeddings'] if include_embeddings else [])
             )
             
+            if not results['documents'] or not results['documents'][0]:
+                return []
+            documents = results['documents'][0]
+            metadatas = results['metadatas'][0]
+            
+            # ip distance is 1 - dot product; threshold the whole array at once
+            scores = 1.0 - np.asarray(results['distances'][0])
+            if score_threshold is None:
+                keep = range(len(scores))
+            else:
+                keep = np.flatnonzero(scores >= score_threshold).tolist()
+            score_list = scores.tolist()
+            
             # Format results
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i in range(len(results['documents'][0])):
-                    formatted_results.append({
-                        'content': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i],
-                        'score': 1 - results['distances'][0][i]  # Convert distance to similarity
-                    })
+            formatted_results = [
+                {
+                    'content': documents[i],
+                    'metadata': metadatas[i],
+                    'score': score_list[i]
+                }
+                for i in keep
+            ]
+            if include_embeddings:
+                # Chroma hands back float64; keep vectors float32
+                embeddings = np.asarray(results['embeddings'][0], dtype=np.float32)
+                for result, i in zip(formatted_results, keep):
+                    result['embedding'] = embeddings[i]
             
             return formatted_results
             
@@ -140,6 +393,37 @@ class EmbeddingManager:
             logger.error(f"Error in similarity search: {str(e)}")
             return []
     
+    def _load_health_probe_embedding(self) -> FloatArray:
+        """Load the health-check query embedding, computing and saving it once."""
+        dimension = self.embedding_model.get_sentence_embedding_dimension()
+        try:
+            embedding = np.load(HEALTH_PROBE_PATH)
+            if embedding.shape == (dimension,):
+                return embedding
+        except (OSError, ValueError):
+            pass
+        
+        # Missing, unreadable or from a different model: rebuild it
+        embedding = self.embed_texts([HEALTH_PROBE_QUERY])[0]
+        np.save(HEALTH_PROBE_PATH, embedding)
+        return embedding
+    
+    def health_probe(self) -> int:
+        """Run a one-result vector query with the precomputed probe embedding.
+        
+        Skips the embedding model entirely, so monitoring can poll it cheaply.
+        Returns the number of hits (0 if the collection is empty).
+        """
+        if self._health_probe_embedding is None:
+            self._health_probe_embedding = self._load_health_probe_embedding()
+        
+        results = self.collection.query(
+            query_embeddings=[self._health_probe_embedding],
+            n_results=1,
+            include=[]
+        )
+        return len(results['ids'][0])
+    
     def get_collection_stats(self) -> dict:
         """Get statistics about the collection."""
         try:
@@ -162,8 +446,11 @@ class EmbeddingManager:
             # Recreate the collection
             self.collection = self.chroma_client.get_or_create_collection(
                 name="occams_advisory",
-                metadata={"hnsw:space": "cosine"}
+                metadata=COLLECTION_METADATA,
+                embedding_function=self.embedding_function
             )
+            self._invalidate_quantized_index()
+            self.clear_cache()
             
             logger.info("Collection cleared successfully")
             
@@ -180,8 +467,12 @@ class EmbeddingManager:
             return False
 
 
-def create_vector_database(documents: List[Document]) -> EmbeddingManager:
-    """Create vector database from documents."""
+def create_vector_database(documents: Iterable[Chunk]) -> EmbeddingManager:
+    """Create vector database from documents.
+    
+    Accepts any iterable (e.g. ``DocumentChunker.iter_chunks()``) and embeds
+    it in batches of INGEST_BATCH_SIZE, so a generator is never materialized.
+    """
     embedding_manager = EmbeddingManager()
     
     # Clear existing collection if needed
@@ -189,8 +480,8 @@ def create_vector_database(documents: List[Document]) -> EmbeddingManager:
         logger.info("Collection already exists. Clearing...")
         embedding_manager.clear_collection()
     
-    # Embed documents
-    embedding_manager.embed_documents(documents)
+    # Embed documents in streaming batches
+    embedding_manager.embed_document_stream(documents)
     
     # Print stats
     stats = embedding_manager.get_collection_stats()
@@ -201,7 +492,6 @@ def create_vector_database(documents: List[Document]) -> EmbeddingManager:
 
 if __name__ == "__main__":
     # Test embedding functionality
-    from .chunking_utils import create_chunks_from_scraped_data
+    from .chunking_utils import DocumentChunker
     
-    chunks = create_chunks_from_scraped_data()
-    embedding_manager = create_vector_database(chunks)
\ No newline at end of file
+    embedding_manager = create_vector_database(DocumentChunker().iter_chunks())
\ No newline at end of file
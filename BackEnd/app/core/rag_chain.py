@@ -1,34 +1,74 @@
 """RAG chain implementation with Groq LLM."""
 
 import logging
-from typing import List, Dict, Optional
+import threading
+from typing import Dict, Iterator, List, Optional
+import httpx
+import numpy as np
+from cachetools import LRUCache
 from groq import Groq
 
+from .chunking_utils import DocumentChunker
 from .embedding_utils import EmbeddingManager
+from .types import FloatArray
 from ..config import (
     GROQ_API_KEY, LLM_MODEL_NAME, LLM_TEMPERATURE, 
-    MAX_TOKENS, TOP_K_RESULTS, SIMILARITY_THRESHOLD
+    MAX_TOKENS, TOP_K_RESULTS, SIMILARITY_THRESHOLD, QUERY_CACHE_SIZE,
+    ENABLE_MMR, MMR_TOP_K, MMR_LAMBDA
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def mmr(relevance: FloatArray, doc_embeddings: FloatArray, k: int, lambda_mult: float) -> List[int]:
+    """Maximal Marginal Relevance: pick k rows balancing relevance and novelty.
+    
+    ``relevance`` holds each document's similarity to the query. Embeddings
+    are normalized, so one matrix product gives all pairwise similarities.
+    Returns row indices in selection order.
+    """
+    similarity = doc_embeddings @ doc_embeddings.T
+    selected = [int(np.argmax(relevance))]
+    
+    # Highest similarity of each candidate to anything already selected
+    max_similarity = similarity[selected[0]].copy()
+    while len(selected) < min(k, len(relevance)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    
+    return selected
+
+
 class OccamsRAGChain:
     """RAG chain for Occam's Advisory chatbot."""
     
     def __init__(self):
         self.embedding_manager = EmbeddingManager()
-        self.groq_client = Groq(api_key=GROQ_API_KEY)
+        # One pooled HTTP/2 client so concurrent requests reuse TLS sessions
+        self.http_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=30.0
+        )
+        self.groq_client = Groq(api_key=GROQ_API_KEY, http_client=self.http_client)
         self.model_name = LLM_MODEL_NAME
         self.temperature = LLM_TEMPERATURE
         self.max_tokens = MAX_TOKENS
+        self._retrieval_cache = LRUCache(maxsize=QUERY_CACHE_SIZE)
+        self._cache_lock = threading.Lock()  # requests run in worker threads
+        self._reindex_lock = threading.Lock()
         
         print(f"Using LLM model: {LLM_MODEL_NAME}")
 
         
-        # System prompt to ensure responses are strictly based on website content
-        self.system_prompt = """You are a helpful assistant that answers questions about Occam's Advisory based on the information provided in the context below. 
+        # System prompt to ensure responses are strictly based on website content.
+        # It holds only the static rules so the prefix is identical on every
+        # call; the context and question go in the user message.
+        self.system_prompt = """You are a helpful assistant that answers questions about Occam's Advisory based on the information provided in the context in the user's message. 
 
     IMPORTANT GUIDELINES:
 1. use information mentioned in the provided context
@@ -37,66 +77,124 @@ class OccamsRAGChain:
 4. When answering, you may reference that the information comes from Occam's Advisory website
 5. Be helpful and conversational
 6. If user says hii, greet with for first time only "Hello Rahul, how can I help you today?"
-7. If you can partially answer a question based on the context, do so but clearly indicate what information is available and what is not
-Context from Occam's Advisory website:
-{context}
-
-Question: {question}
-
-Answer based only on the context provided above:"""
+7. If you can partially answer a question based on the context, do so but clearly indicate what information is available and what is not"""
     
     def retrieve_relevant_documents(self, query: str) -> List[Dict]:
         """Retrieve relevant documents for the query."""
+        # Repeated questions skip both the embedding and the vector search.
+        # Only the cache key is normalized; the search sees the query as typed
+        query = query.strip()
+        cache_key = query.lower()
+        with self._cache_lock:
+            cached_results = self._retrieval_cache.get(cache_key)
+        if cached_results is not None:
+            logger.info(f"Retrieved {len(cached_results)} relevant documents from cache")
+            return cached_results
+        
         try:
-            results = self.embedding_manager.similarity_search(
+            # The similarity threshold is applied inside the search, on the
+            # raw score array, before any result dicts are built
+            filtered_results = self.embedding_manager.similarity_search(
                 query=query,
-                top_k=TOP_K_RESULTS
+                top_k=TOP_K_RESULTS,
+                score_threshold=SIMILARITY_THRESHOLD,
+                include_embeddings=ENABLE_MMR
             )
             
-            # Filter by similarity threshold
-            filtered_results = [
-                result for result in results 
-                if result['score'] >= SIMILARITY_THRESHOLD
-            ]
+            # Keep a few diverse chunks rather than every near-duplicate,
+            # which shrinks the prompt sent to Groq
+            if ENABLE_MMR:
+                if len(filtered_results) > MMR_TOP_K:
+                    selected = mmr(
+                        np.array([result['score'] for result in filtered_results], dtype=np.float32),
+                        np.stack([result['embedding'] for result in filtered_results]),
+                        MMR_TOP_K,
+                        MMR_LAMBDA
+                    )
+                    filtered_results = [filtered_results[i] for i in selected]
+                for result in filtered_results:
+                    result.pop('embedding', None)
             
             logger.info(f"Retrieved {len(filtered_results)} relevant documents for query")
+            
+            # Empty results may come from a failed search, so don't pin them
+            if filtered_results:
+                with self._cache_lock:
+                    self._retrieval_cache[cache_key] = filtered_results
             return filtered_results
             
         except Exception as e:
             logger.error(f"Error retrieving documents: {str(e)}")
             return []
     
+    def clear_cache(self):
+        """Drop cached retrieval results and query embeddings."""
+        with self._cache_lock:
+            self._retrieval_cache.clear()
+        self.embedding_manager.clear_cache()
+    
+    def close(self):
+        """Close the pooled HTTP client used for Groq requests."""
+        self.http_client.close()
+    
+    def reindex(self) -> Dict:
+        """Re-chunk the scraped data and upsert it into the live collection.
+        
+        Chunks are streamed from disk in batches, so memory stays bounded,
+        and stable chunk IDs let the upsert replace pages in place while
+        queries keep being served. Chunks left over from pages that shrank
+        or were removed are deleted at the end.
+        """
+        with self._reindex_lock:
+            chunker = DocumentChunker()
+            count = self.embedding_manager.embed_document_stream(chunker.iter_chunks(), prune=True)
+            self.clear_cache()
+            
+            stats = self.embedding_manager.get_collection_stats()
+            logger.info(f"Reindexed {count} chunks: {stats}")
+            return {"chunks_indexed": count, "vector_db_stats": stats}
+    
     def format_context(self, documents: List[Dict]) -> str:
         """Format retrieved documents into context string."""
         if not documents:
             return "No relevant information found in Occam's Advisory materials."
         
+        # Collect the pieces and join once, instead of building an
+        # intermediate string per document
         context_parts = []
         for i, doc in enumerate(documents, 1):
             metadata = doc['metadata']
-            content = doc['content']
-            
-            context_part = f"""
-Document {i} (Source: {metadata.get('url', 'N/A')}):
-Title: {metadata.get('title', 'N/A')}
-Content: {content}
-"""
-            context_parts.append(context_part)
+            context_parts += (
+                "\nDocument ", str(i), " (Source: ", metadata.get('url', 'N/A'), "):\n",
+                "Title: ", metadata.get('title', 'N/A'), "\n",
+                "Content: ", doc['content'], "\n\n"
+            )
+        context_parts[-1] = "\n"  # no separator after the last document
         
-        return "\n".join(context_parts)
+        return "".join(context_parts)
+    
+    def build_messages(self, query: str, context: str) -> List[Dict]:
+        """Build the chat messages: static rules as system, context + question as user."""
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {
+                "role": "user",
+                "content": f"""Context from Occam's Advisory website:
+{context}
+
+Question: {query}
+
+Answer based only on the context provided above:"""
+            }
+        ]
     
     def generate_response(self, query: str, context: str) -> str:
         """Generate response using Groq LLM."""
         try:
-            # Format the prompt
-            prompt = self.system_prompt.format(context=context, question=query)
-            
             # Call Groq API
             response = self.groq_client.chat.completions.create(
                 model=self.model_name,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self.build_messages(query, context),
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
                 top_p=1,
@@ -109,6 +207,38 @@ Content: {content}
             logger.error(f"Error generating response: {str(e)}")
             return "I apologize, but I'm having trouble generating a response right now. Please try again."
     
+    def stream_response(self, query: str, context: str) -> Iterator[str]:
+        """Stream the Groq completion, yielding content tokens as they arrive."""
+        try:
+            stream = self.groq_client.chat.completions.create(
+                model=self.model_name,
+                messages=self.build_messages(query, context),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                top_p=1,
+                stream=True
+            )
+            
+            for chunk in stream:
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield token
+                    
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            yield "I apologize, but I'm having trouble generating a response right now. Please try again."
+    
+    def format_sources(self, documents: List[Dict]) -> List[Dict]:
+        """Format retrieved documents into source citations."""
+        return [
+            {
+                "url": doc['metadata'].get('url', 'N/A'),
+                "title": doc['metadata'].get('title', 'N/A'),
+                "score": round(doc['score'], 3)
+            }
+            for doc in documents
+        ]
+    
     def answer_question(self, question: str) -> Dict:
         """Complete RAG pipeline: retrieve, format, generate."""
         try:
@@ -124,14 +254,7 @@ Content: {content}
             # Return structured response
             return {
                 "answer": response,
-                "sources": [
-                    {
-                        "url": doc['metadata'].get('url', 'N/A'),
-                        "title": doc['metadata'].get('title', 'N/A'),
-                        "score": round(doc['score'], 3)
-                    }
-                    for doc in relevant_docs
-                ],
+                "sources": self.format_sources(relevant_docs),
                 "context_used": len(relevant_docs) > 0
             }
             
@@ -143,19 +266,34 @@ Content: {content}
                 "context_used": False
             }
     
+    def stream_answer(self, question: str) -> Iterator[Dict]:
+        """Streaming RAG pipeline: yield answer tokens, then the sources."""
+        relevant_docs = self.retrieve_relevant_documents(question)
+        context = self.format_context(relevant_docs)
+        
+        for token in self.stream_response(question, context):
+            yield {"type": "token", "content": token}
+        
+        yield {
+            "type": "sources",
+            "sources": self.format_sources(relevant_docs),
+            "context_used": len(relevant_docs) > 0
+        }
+    
     def health_check(self) -> Dict:
         """Check if RAG system is working properly."""
         try:
             # Check vector database
             stats = self.embedding_manager.get_collection_stats()
             
-            # Test query
-            test_response = self.answer_question("What is Occam's Advisory?")
+            # Test query against the vector DB with a precomputed embedding;
+            # no model forward pass and no LLM call
+            hits = self.embedding_manager.health_probe()
             
             return {
                 "status": "healthy",
                 "vector_db_stats": stats,
-                "test_query_successful": len(test_response["answer"]) > 0
+                "test_query_successful": hits > 0
             }
             
         except Exception as e:
@@ -168,16 +306,28 @@ Content: {content}
 
 # Global RAG chain instance
 rag_chain = None
+_rag_chain_lock = threading.Lock()
 
 
 def get_rag_chain() -> OccamsRAGChain:
     """Get or create RAG chain instance."""
     global rag_chain
     if rag_chain is None:
-        rag_chain = OccamsRAGChain()
+        with _rag_chain_lock:
+            if rag_chain is None:
+                rag_chain = OccamsRAGChain()
     return rag_chain
 
 
+def shutdown_rag_system():
+    """Release the RAG chain's network resources, if it was ever created."""
+    global rag_chain
+    with _rag_chain_lock:
+        if rag_chain is not None:
+            rag_chain.close()
+            rag_chain = None
+
+
 def initialize_rag_system():
     """Initialize the RAG system."""
     try:
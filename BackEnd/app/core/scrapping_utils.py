@@ -1,59 +1,182 @@
 """Web scraping utilities using Playwright - Enhanced for complete navigation coverage."""
 
 import asyncio
-import json
 import logging
-from typing import List, Dict, Set
-from urllib.parse import urljoin, urlparse
-from playwright.async_api import async_playwright, Page
-from bs4 import BeautifulSoup
+import re
+import shelve
+from functools import lru_cache
+from typing import List, Dict, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+from playwright.async_api import async_playwright, BrowserContext, Page, Route
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+import orjson
+import xxhash
+from aiolimiter import AsyncLimiter
+import lxml.html
+from pybloom_live import ScalableBloomFilter
 import time
 from pathlib import Path
 
-from ..config import TARGET_WEBSITE_URL, DATA_DIR, SCRAPING_DELAY, MAX_PAGES_TO_SCRAPE
+from ..config import (
+    TARGET_WEBSITE_URL, DATA_DIR, SCRAPE_RATE_LIMIT, MAX_PAGES_TO_SCRAPE, SCRAPE_CONCURRENCY,
+    PAGE_LOAD_TIMEOUT_MS, SCRAPE_CACHE_TTL, CONTEXT_RECYCLE_PAGES, MIN_PAGE_CONTENT_LENGTH
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# URL filters, built once: endswith takes the whole tuple in one C call and
+# the patterns are matched in a single regex pass over the URL
+UNWANTED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.css', '.js', '.ico', '.xml', '.zip')
+UNWANTED_PATTERNS = re.compile(r"#|mailto:|tel:|javascript:|login|admin")  # admin also covers wp-admin
+
+# Section keywords, matched anywhere in a link's href or text in one regex scan
+MAIN_SECTION_PATTERN = re.compile(
+    r"about|services|team|resources|contact|portfolio|blog|news|careers|clients"
+)
+SECTION_KEYWORD_PATTERN = re.compile(r"about|services|team|resources|contact|portfolio|blog")
+
+# Only HTML and scripts are needed to render text; everything else is aborted
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+
+# Read every matching anchor in one JS evaluation instead of one IPC
+# round-trip per element
+HREFS_JS = "els => els.map(e => e.getAttribute('href'))"
+HREFS_AND_TEXT_JS = (
+    "els => els.map(e => ({href: e.getAttribute('href'), "
+    "text: (e.innerText || '').toLowerCase().trim()}))"
+)
+
+# Text cleanup, compiled once: control characters other than newline and tab
+# are dropped in one str.translate pass, blank runs collapse in one regex pass
+CONTROL_CHARS = dict.fromkeys(c for c in range(32) if c not in (9, 10))
+MULTI_NEWLINE = re.compile(r"\n{3,}")
+WHITESPACE = re.compile(r"\s+")
+SKIP_LINES = frozenset(('home', 'menu', 'skip'))
+# Elements that start a new line of text, as in the browser's innerText;
+# text inside anything else (links, bold, spans) runs on within its line
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'td', 'th', 'tr', 'ul'
+))
+
+# Main-content candidates as XPath, tried in order; the equivalent CSS is
+# main, article, .content, #content, .main-content, .page-content,
+# .entry-content, .post-content, [role="main"]
+CLASS_XPATH = "//*[contains(concat(' ', normalize-space(@class), ' '), ' {} ')]"
+CONTENT_XPATHS = [
+    "//main", "//article", CLASS_XPATH.format('content'), "//*[@id='content']",
+    CLASS_XPATH.format('main-content'), CLASS_XPATH.format('page-content'),
+    CLASS_XPATH.format('entry-content'), CLASS_XPATH.format('post-content'),
+    "//*[@role='main']"
+]
+# Boilerplate and ads stripped before any text is read
+UNWANTED_ELEMENTS_XPATH = "|".join((
+    "//script", "//style", "//nav", "//footer", "//header", "//aside",
+    CLASS_XPATH.format('advertisement')
+))
+
+# The same URLs are parsed again and again (validation, subsection checks,
+# dedup), so parse results and canonical forms are memoized per string
+cached_urlparse = lru_cache(maxsize=100_000)(urlparse)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+@lru_cache(maxsize=100_000)
+def canonical_url(url: str) -> str:
+    """Canonical form of a URL for dedup: lowercase scheme and host, no
+    default port, trailing slash or fragment, sorted query parameters."""
+    parsed = cached_urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = parsed.hostname or ''
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    query = urlencode(sorted(parse_qsl(parsed.query)))
+    return urlunparse((scheme, host, parsed.path.rstrip('/'), '', query, ''))
+
+
+def url_fingerprint(url: str) -> int:
+    """64-bit xxh3 fingerprint of a URL's canonical form, used for dedup."""
+    return xxhash.xxh3_64_intdigest(canonical_url(url).encode('utf-8'))
+
 
 class OccamsWebScraper:
     """Enhanced web scraper for Occam's Advisory website using Playwright."""
     
     def __init__(self, base_url: str = TARGET_WEBSITE_URL):
         self.base_url = base_url
-        self.domain = urlparse(base_url).netloc
-        self.scraped_urls: Set[str] = set()
+        self.domain = cached_urlparse(base_url).netloc
+        # Scraped pages as 64-bit fingerprints of their canonical URL: exact
+        # membership at 8 bytes a URL instead of the full string
+        self.scraped_fps: Set[int] = set()
         self.scraped_data: List[Dict] = []
         self.navigation_links: Set[str] = set()  # Store navigation links separately
+        # Internal links seen on scraped pages, gathered during the first
+        # visit so remaining pages are found without loading anything twice.
+        # Every link ever queued goes in the Bloom filter (~10 bits each) so
+        # it is queued once; membership can false-positive at error_rate
+        self.frontier: Set[str] = set()
+        self.discovered = ScalableBloomFilter(initial_capacity=10000, error_rate=0.001)
+        
+        # Pages are scraped concurrently, each in its own tab of one shared
+        # context; the semaphore caps open tabs and the lock guards the
+        # shared results, with in-flight URLs claimed so no page loads twice
+        self.context: BrowserContext = None
+        self.concurrency = SCRAPE_CONCURRENCY
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self._lock = asyncio.Lock()
+        self._in_flight: Set[int] = set()
+        # Token bucket shared by all tabs: page loads go out at up to
+        # SCRAPE_RATE_LIMIT per second, in bursts when the server is fast
+        self.limiter = AsyncLimiter(SCRAPE_RATE_LIMIT, time_period=1.0)
+        
+        # Long-lived contexts (especially with routes) leak memory, so the
+        # context is relaunched every CONTEXT_RECYCLE_PAGES page loads
+        self.playwright = None
+        self._pages_since_recycle = 0
+        self._recycling = False
+        
+        # Extracted pages from earlier runs, keyed by canonical URL
+        self.cache: shelve.Shelf = None
+        # Each page is appended here as it is scraped, so a crash keeps progress
+        self.progress_file = None
         
     async def scrape_website(self) -> List[Dict]:
         """Scrape the entire website with enhanced navigation coverage."""
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context()
-            page = await context.new_page()
+            self.playwright = p
+            await self._open_context()
+            self.cache = shelve.open(str(DATA_DIR / "scrape_cache.db"))
+            self.progress_file = open(DATA_DIR / "scraped_data.jsonl", 'wb')
             
             try:
                 # First, extract all navigation links from homepage
                 logger.info("Extracting navigation structure...")
-                await page.goto(self.base_url, wait_until="networkidle")
-                await page.wait_for_timeout(3000)  # Wait for dynamic content
-                
-                # Extract navigation links first
-                nav_links = await self._extract_navigation_links(page)
+                page = await self.context.new_page()
+                try:
+                    await self._load_page(page, self.base_url, "nav, header")
+                    
+                    # Extract navigation links first
+                    nav_links = await self._extract_navigation_links(page)
+                finally:
+                    await page.close()
                 logger.info(f"Found {len(nav_links)} navigation links: {nav_links}")
                 
                 # Scrape homepage first
-                await self._scrape_single_page(page, self.base_url)
+                await self._scrape_single_page(self.base_url)
                 
                 # Then scrape all navigation pages and their subsections
-                for nav_url in nav_links:
-                    if nav_url not in self.scraped_urls:
-                        await asyncio.sleep(SCRAPING_DELAY)
-                        await self._scrape_page_with_subsections(page, nav_url)
+                await asyncio.gather(*[
+                    self._scrape_page_with_subsections(nav_url)
+                    for nav_url in nav_links
+                    if url_fingerprint(nav_url) not in self.scraped_fps
+                ])
                 
                 # Finally, do a recursive scrape for any remaining internal links
-                await self._scrape_remaining_pages(page)
+                await self._scrape_remaining_pages()
                 
                 # Save scraped data
                 await self._save_scraped_data()
@@ -65,15 +188,17 @@ class OccamsWebScraper:
                 logger.error(f"Error during scraping: {str(e)}")
                 raise
             finally:
-                await browser.close()
+                self.progress_file.close()
+                self.cache.close()
+                await self.context.close()
     
     async def _extract_navigation_links(self, page: Page) -> List[str]:
         """Extract all navigation links including main nav and dropdowns."""
         nav_links = []
         
         try:
-            # Common navigation selectors
-            nav_selectors = [
+            # Common navigation selectors, queried together
+            nav_selectors = ', '.join([
                 'nav a[href]',
                 '.navigation a[href]',
                 '.nav a[href]',
@@ -82,7 +207,7 @@ class OccamsWebScraper:
                 'header a[href]',
                 '.main-nav a[href]',
                 '.primary-nav a[href]'
-            ]
+            ])
             
             # Try to interact with dropdown menus first
             dropdown_triggers = await page.query_selector_all('nav .dropdown, nav .has-dropdown, .menu-item-has-children')
@@ -94,36 +219,29 @@ class OccamsWebScraper:
                     pass
             
             # Extract all navigation links
-            for selector in nav_selectors:
-                try:
-                    elements = await page.query_selector_all(selector)
-                    for element in elements:
-                        href = await element.get_attribute('href')
-                        if href:
-                            full_url = urljoin(self.base_url, href)
-                            if self._is_valid_url(full_url) and self._is_main_section(href):
-                                nav_links.append(full_url)
-                                logger.info(f"Found navigation link: {full_url}")
-                except Exception as e:
-                    logger.debug(f"Error with selector {selector}: {e}")
-                    continue
-            
-            # Also look for specific section keywords in link text
-            all_links = await page.query_selector_all('a[href]')
-            for element in all_links:
-                try:
-                    link_text = (await element.inner_text()).lower().strip()
-                    href = await element.get_attribute('href')
-                    
-                    # Check for main section keywords
-                    section_keywords = ['about', 'services', 'team', 'resources', 'contact', 'portfolio', 'blog']
-                    if any(keyword in link_text for keyword in section_keywords) and href:
+            try:
+                hrefs = await page.eval_on_selector_all(nav_selectors, HREFS_JS)
+                for href in hrefs:
+                    if href:
                         full_url = urljoin(self.base_url, href)
-                        if self._is_valid_url(full_url):
+                        if self._is_valid_url(full_url) and self._is_main_section(href):
                             nav_links.append(full_url)
-                            logger.info(f"Found section link by text '{link_text}': {full_url}")
-                except:
-                    continue
+                            logger.info(f"Found navigation link: {full_url}")
+            except Exception as e:
+                logger.debug(f"Error with navigation selectors: {e}")
+            
+            # Also look for specific section keywords in link text
+            anchors = await page.eval_on_selector_all('a[href]', HREFS_AND_TEXT_JS)
+            for anchor in anchors:
+                link_text = anchor['text']
+                href = anchor['href']
+                
+                # Check for main section keywords
+                if href and SECTION_KEYWORD_PATTERN.search(link_text):
+                    full_url = urljoin(self.base_url, href)
+                    if self._is_valid_url(full_url):
+                        nav_links.append(full_url)
+                        logger.info(f"Found section link by text '{link_text}': {full_url}")
             
             # Remove duplicates while preserving order
             unique_links = list(dict.fromkeys(nav_links))
@@ -135,191 +253,285 @@ class OccamsWebScraper:
     
     def _is_main_section(self, href: str) -> bool:
         """Check if link appears to be a main section."""
-        href_lower = href.lower()
-        main_sections = [
-            'about', 'services', 'team', 'resources', 'contact', 
-            'portfolio', 'blog', 'news', 'careers', 'clients'
-        ]
-        
         # Check if href contains main section keywords
-        return any(section in href_lower for section in main_sections)
+        return MAIN_SECTION_PATTERN.search(href.lower()) is not None
     
-    async def _scrape_page_with_subsections(self, page: Page, url: str):
+    async def _scrape_page_with_subsections(self, url: str):
         """Scrape a page and all its subsections."""
-        if url in self.scraped_urls or len(self.scraped_data) >= MAX_PAGES_TO_SCRAPE:
+        if url_fingerprint(url) in self.scraped_fps or len(self.scraped_data) >= MAX_PAGES_TO_SCRAPE:
             return
         
         try:
             logger.info(f"Scraping main section: {url}")
             
-            # Scrape the main page
-            await self._scrape_single_page(page, url)
+            # Scrape the main page, collecting its links while it's open
+            page_links = await self._scrape_single_page(url)
             
             # Look for subsections on this page
-            subsection_links = await self._extract_subsection_links(page, url)
+            subsection_links = self._extract_subsection_links(page_links, url)
             
-            for subsection_url in subsection_links[:5]:  # Limit subsections per main section
-                if subsection_url not in self.scraped_urls:
-                    await asyncio.sleep(SCRAPING_DELAY)
-                    await self._scrape_single_page(page, subsection_url)
+            await asyncio.gather(*[
+                self._scrape_single_page(subsection_url)
+                for subsection_url in subsection_links[:5]  # Limit subsections per main section
+                if url_fingerprint(subsection_url) not in self.scraped_fps
+            ])
                     
         except Exception as e:
             logger.error(f"Error scraping section {url}: {str(e)}")
     
-    async def _extract_subsection_links(self, page: Page, parent_url: str) -> List[str]:
-        """Extract subsection links from the current page."""
-        subsection_links = []
-        
-        try:
-            # Look for links that seem to be subsections of the current page
-            all_links = await page.query_selector_all('a[href]')
-            
-            for element in all_links:
-                href = await element.get_attribute('href')
-                if href:
-                    full_url = urljoin(self.base_url, href)
-                    
-                    # Check if this could be a subsection
-                    if (self._is_valid_url(full_url) and 
-                        self._is_likely_subsection(parent_url, full_url)):
-                        subsection_links.append(full_url)
-            
-            return list(dict.fromkeys(subsection_links))
-            
-        except Exception as e:
-            logger.error(f"Error extracting subsections from {parent_url}: {str(e)}")
-            return []
+    def _extract_subsection_links(self, page_links: List[str], parent_url: str) -> List[str]:
+        """Pick the links from a page that look like subsections of it."""
+        # The parent path is sliced once rather than once per link
+        parent_path = cached_urlparse(parent_url).path.strip('/')
+        return [
+            link for link in page_links
+            if self._is_likely_subsection(parent_path, link)
+        ]
     
-    def _is_likely_subsection(self, parent_url: str, child_url: str) -> bool:
-        """Check if child_url is likely a subsection of parent_url."""
-        parent_path = urlparse(parent_url).path.strip('/')
-        child_path = urlparse(child_url).path.strip('/')
+    def _is_likely_subsection(self, parent_path: str, child_url: str) -> bool:
+        """Check if child_url is likely a subsection of the page at parent_path."""
+        child_path = cached_urlparse(child_url).path.strip('/')
         
         # If child path starts with parent path, it's likely a subsection
         return child_path.startswith(parent_path) and child_path != parent_path
     
-    async def _scrape_single_page(self, page: Page, url: str):
-        """Scrape a single page."""
-        if url in self.scraped_urls:
+    async def _open_context(self):
+        """Launch the persistent browser context used for every page."""
+        # A persistent profile keeps the HTTP cache and cookies between
+        # runs (and recycles), so static assets and revisited pages load from disk
+        self.context = await self.playwright.chromium.launch_persistent_context(
+            user_data_dir=str(DATA_DIR / "pw_profile"),
+            headless=True
+        )
+        self.context.set_default_navigation_timeout(PAGE_LOAD_TIMEOUT_MS)
+        await self.context.route("**/*", self._block_heavy_resources)
+    
+    async def _maybe_recycle_context(self):
+        """Relaunch the context once CONTEXT_RECYCLE_PAGES pages have loaded in it."""
+        if self._pages_since_recycle < CONTEXT_RECYCLE_PAGES or self._recycling:
             return
         
+        self._recycling = True
+        # Take every semaphore slot so in-flight pages finish first
+        for _ in range(self.concurrency):
+            await self.semaphore.acquire()
         try:
-            logger.info(f"Scraping page: {url}")
-            
-            response = await page.goto(url, wait_until="networkidle")
-            
-            if response.status != 200:
-                logger.warning(f"Failed to load {url}: HTTP {response.status}")
-                return
-            
-            # Wait for content to load
-            await page.wait_for_timeout(2000)
-            
-            # Handle dynamic content loading
-            try:
-                await page.wait_for_load_state("domcontentloaded")
-            except:
-                pass
+            logger.info(f"Recycling browser context after {self._pages_since_recycle} pages")
+            await self.context.close()
+            await self._open_context()
+            self._pages_since_recycle = 0
+        finally:
+            for _ in range(self.concurrency):
+                self.semaphore.release()
+            self._recycling = False
+    
+    @staticmethod
+    async def _block_heavy_resources(route: Route):
+        """Abort images, media, fonts and stylesheets before they download."""
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def _load_page(self, page: Page, url: str, ready_selector: str = "main, article, body"):
+        """Navigate to url, returning once the DOM is parsed.
+        
+        Waiting for networkidle can hang on analytics beacons and long-polls,
+        so navigation only waits for DOMContentLoaded and a timeout is not
+        fatal: extraction proceeds from whatever has been parsed. Returns the
+        response, or None if navigation timed out.
+        """
+        stopped = None
+        
+        async def stop_non_html(response):
+            # Links that slip past the URL filters can point at large non-HTML
+            # resources; stop as soon as the headers arrive instead of
+            # downloading the whole body. Redirect hops often carry no
+            # content type, and stopping one would abort the navigation.
+            nonlocal stopped
+            request = response.request
+            if request.is_navigation_request() and request.frame == page.main_frame \
+                    and not 300 <= response.status < 400 and not self._is_html(response):
+                stopped = response
+                try:
+                    await page.evaluate("window.stop()")
+                except Exception as e:
+                    logger.debug(f"Could not stop {url}: {str(e)}")
+        
+        response = None
+        page.on("response", stop_non_html)
+        try:
+            await self.limiter.acquire()
+            response = await page.goto(url, wait_until="domcontentloaded")
+        except PlaywrightTimeoutError:
+            logger.warning(f"Timed out loading {url}, using partially loaded page")
+        except PlaywrightError:
+            # Stopping a non-HTML load aborts the navigation; its response
+            # is still what the caller needs to skip the page
+            if stopped is None:
+                raise
+            response = stopped
+        finally:
+            page.remove_listener("response", stop_non_html)
+        
+        if response is not None and not self._is_html(response):
+            return response
+        
+        # Give client-rendered pages a moment to mount their content
+        try:
+            await page.wait_for_selector(ready_selector, timeout=2000)
+        except PlaywrightTimeoutError:
+            pass
+        
+        return response
+    
+    @staticmethod
+    def _is_html(response) -> bool:
+        """Check whether a response carries an HTML document."""
+        return 'text/html' in response.headers.get('content-type', '')
+    
+    async def _scrape_single_page(self, url: str) -> List[str]:
+        """Scrape a single page in its own tab; returns the internal links on it."""
+        key = canonical_url(url)
+        fp = url_fingerprint(url)
+        async with self._lock:
+            if (fp in self.scraped_fps or fp in self._in_flight
+                    or len(self.scraped_data) >= MAX_PAGES_TO_SCRAPE):
+                return []
+            self._in_flight.add(fp)
+        
+        try:
+            # Pages extracted within the TTL are reused without loading them
+            cached = self.cache.get(key)
+            if cached and time.time() - cached['page_data']['scraped_at'] < SCRAPE_CACHE_TTL:
+                await self._record_page(fp, cached['page_data'], cached['links'])
+                logger.info(f"Using cached copy of: {url}")
+                return cached['links']
             
-            content = await page.content()
-            page_data = await self._extract_page_data(page, url, content)
+            async with self.semaphore:
+                logger.info(f"Scraping page: {url}")
+                
+                page = await self.context.new_page()
+                try:
+                    response = await self._load_page(page, url)
+                    
+                    if response is not None and response.status != 200:
+                        logger.warning(f"Failed to load {url}: HTTP {response.status}")
+                        return []
+                    
+                    if response is not None and not self._is_html(response):
+                        logger.info(f"Skipping non-HTML page: {url}")
+                        return []
+                    
+                    content = await page.content()
+                    page_data = self._extract_page_data(url, content)
+                    page_links = await self._extract_internal_links(page)
+                finally:
+                    await page.close()
+                    self._pages_since_recycle += 1
+            await self._maybe_recycle_context()
             
-            if page_data and page_data['content'].strip():
-                self.scraped_data.append(page_data)
-                self.scraped_urls.add(url)
+            if page_data:
+                await self._record_page(fp, page_data, page_links)
+                self.cache[key] = {'page_data': page_data, 'links': page_links}
                 logger.info(f"Successfully scraped: {url}")
             else:
                 logger.warning(f"No content extracted from: {url}")
+            
+            return page_links
                 
         except Exception as e:
             logger.error(f"Error scraping {url}: {str(e)}")
+            return []
+        finally:
+            self._in_flight.discard(fp)
+    
+    async def _record_page(self, fp: int, page_data: Dict, links: List[str]):
+        """Add a scraped page to the results, up to MAX_PAGES_TO_SCRAPE, and
+        its unscraped links to the frontier."""
+        async with self._lock:
+            if len(self.scraped_data) < MAX_PAGES_TO_SCRAPE:
+                self.scraped_data.append(page_data)
+                self.scraped_fps.add(fp)
+                for link in links:
+                    # add() returns True if the link was (probably) already there
+                    if url_fingerprint(link) not in self.scraped_fps \
+                            and not self.discovered.add(canonical_url(link)):
+                        self.frontier.add(link)
+                self.progress_file.write(orjson.dumps(page_data) + b'\n')
+                self.progress_file.flush()
     
-    async def _scrape_remaining_pages(self, page: Page):
+    async def _scrape_remaining_pages(self):
         """Scrape any remaining internal links not already covered."""
         if len(self.scraped_data) >= MAX_PAGES_TO_SCRAPE:
             return
         
-        # Get all unique internal links from already scraped pages
-        all_internal_links = set()
-        
-        for scraped_page in self.scraped_data:
-            try:
-                await page.goto(scraped_page['url'], wait_until="networkidle")
-                page_links = await self._extract_internal_links(page)
-                all_internal_links.update(page_links)
-            except:
-                continue
-        
-        # Scrape unscraped internal links
-        remaining_links = all_internal_links - self.scraped_urls
+        # Links from every scraped page were collected on its first visit;
+        # drop any that have been scraped since
+        remaining_links = [
+            link for link in self.frontier
+            if url_fingerprint(link) not in self.scraped_fps
+        ]
+        self.frontier.clear()
         
-        for link in list(remaining_links)[:10]:  # Limit additional pages
-            if len(self.scraped_data) >= MAX_PAGES_TO_SCRAPE:
-                break
-            await asyncio.sleep(SCRAPING_DELAY)
-            await self._scrape_single_page(page, link)
+        await asyncio.gather(*[
+            self._scrape_single_page(link)
+            for link in remaining_links[:10]  # Limit additional pages
+        ])
     
-    async def _extract_page_data(self, page: Page, url: str, html_content: str) -> Dict:
-        """Extract structured data from a page."""
-        soup = BeautifulSoup(html_content, 'html.parser')
+    def _extract_page_data(self, url: str, html_content: str) -> Optional[Dict]:
+        """Extract structured data from a page.
         
-        # Remove unwanted elements
-        for element in soup(["script", "style", "nav", "footer", "header", "aside", ".advertisement"]):
-            element.decompose()
+        Everything is read from one lxml parse of the page HTML with C-level
+        XPath queries, rather than through per-selector round-trips to the
+        browser or a Python-level walk of the tree. Returns None for pages
+        with too little text to keep.
+        """
+        tree = lxml.html.document_fromstring(html_content)
         
-        # Extract title
-        title = ""
-        try:
-            title_element = await page.query_selector('h1, title')
-            if title_element:
-                title = await title_element.inner_text()
-            elif soup.title:
-                title = soup.title.string
-        except:
-            pass
+        # Remove unwanted elements in one XPath pass (their tail text stays
+        # in the document)
+        for element in tree.xpath(UNWANTED_ELEMENTS_XPATH):
+            element.drop_tree()
         
         # Extract main content with multiple strategies
         content = ""
-        content_selectors = [
-            'main', 'article', '.content', '#content', '.main-content', 
-            '.page-content', '.entry-content', '.post-content', '[role="main"]'
-        ]
-        
-        for selector in content_selectors:
-            try:
-                element = await page.query_selector(selector)
-                if element:
-                    content = await element.inner_text()
-                    if content.strip():
-                        break
-            except:
-                continue
+        for xpath in CONTENT_XPATHS:
+            elements = tree.xpath(xpath)
+            if elements:
+                content = self._element_text(elements[0])
+                if content:
+                    break
         
         # Fallback to body text if no main content found
-        if not content.strip():
-            try:
-                body_element = await page.query_selector('body')
-                if body_element:
-                    content = await body_element.inner_text()
-                else:
-                    content = soup.get_text()
-            except:
-                content = soup.get_text()
+        if not content:
+            bodies = tree.xpath("//body")
+            content = self._element_text(bodies[0] if bodies else tree)
         
         # Clean up content
         content = self._clean_text(content)
         
+        # Pages this thin are discarded, so skip the rest of the extraction
+        if len(content) < MIN_PAGE_CONTENT_LENGTH:
+            return None
+        
+        # Extract title (first <h1> or <title> in document order)
+        title = ""
+        title_elements = tree.xpath("(//h1|//title)[1]")
+        if title_elements:
+            title = title_elements[0].text_content()
+        
         # Extract meta description
-        meta_desc = ""
-        meta_element = soup.find('meta', attrs={'name': 'description'})
-        if meta_element:
-            meta_desc = meta_element.get('content', '')
+        meta_desc = tree.xpath("string(//meta[@name='description']/@content)")
         
         # Extract headings for better structure
-        headings = []
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            if heading.get_text().strip():
-                headings.append(heading.get_text().strip())
+        headings = [
+            text for text in (
+                heading.text_content().strip()
+                for heading in tree.xpath("//h1|//h2|//h3|//h4|//h5|//h6")
+            )
+            if text
+        ]
         
         return {
             'url': url,
@@ -331,14 +543,51 @@ class OccamsWebScraper:
             'word_count': len(content.split()) if content else 0
         }
     
+    @staticmethod
+    def _element_text(element) -> str:
+        """Text of an element's subtree, one line per block-level element.
+        
+        Inline markup is joined into the surrounding line and runs of
+        whitespace collapse to one space, as in the browser's innerText.
+        """
+        parts = []
+        
+        def add_text(text):
+            if text:
+                parts.append(WHITESPACE.sub(" ", text))
+        
+        # Depth-first walk with an explicit stack; each element is pushed a
+        # second time so its closing line break and tail text follow its children
+        stack = [(element, False)]
+        while stack:
+            node, closing = stack.pop()
+            # Comments and processing instructions have no text of their own
+            is_element = isinstance(node.tag, str)
+            is_block = is_element and node.tag.lower() in BLOCK_TAGS
+            
+            if not closing and is_element:
+                if is_block:
+                    parts.append("\n")
+                add_text(node.text)
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node))
+                continue
+            
+            if is_block:
+                parts.append("\n")
+            if node is not element:
+                add_text(node.tail)
+        
+        lines = (line.strip() for line in "".join(parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+    
     async def _extract_internal_links(self, page: Page) -> List[str]:
         """Extract internal links from the current page."""
         links = []
         try:
-            anchor_elements = await page.query_selector_all('a[href]')
+            hrefs = await page.eval_on_selector_all('a[href]', HREFS_JS)
             
-            for element in anchor_elements:
-                href = await element.get_attribute('href')
+            for href in hrefs:
                 if href:
                     full_url = urljoin(self.base_url, href)
                     if self._is_valid_url(full_url):
@@ -352,20 +601,20 @@ class OccamsWebScraper:
     
     def _is_valid_url(self, url: str) -> bool:
         """Check if URL is valid for scraping."""
-        parsed = urlparse(url)
+        parsed = cached_urlparse(url)
         
         # Must be same domain
         if parsed.netloc != self.domain:
             return False
         
+        url_lower = url.lower()
+        
         # Skip unwanted file types
-        unwanted_extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.gif', '.css', '.js', '.ico', '.xml', '.zip'}
-        if any(url.lower().endswith(ext) for ext in unwanted_extensions):
+        if url_lower.endswith(UNWANTED_EXTENSIONS):
             return False
         
         # Skip unwanted paths
-        unwanted_patterns = {'#', 'mailto:', 'tel:', 'javascript:', 'login', 'admin', 'wp-admin'}
-        if any(pattern in url.lower() for pattern in unwanted_patterns):
+        if UNWANTED_PATTERNS.search(url_lower):
             return False
         
         return True
@@ -376,21 +625,20 @@ class OccamsWebScraper:
             return ""
         
         # Split into lines and clean each
-        lines = text.split('\n')
+        lines = text.translate(CONTROL_CHARS).split('\n')
         cleaned_lines = []
         
         for line in lines:
             line = line.strip()
             # Skip very short lines and navigation items
-            if line and len(line) > 3 and not line.lower() in ['home', 'menu', 'skip']:
+            if len(line) > 3 and line.lower() not in SKIP_LINES:
                 cleaned_lines.append(line)
         
         # Join lines and clean up extra whitespace
         cleaned_text = '\n'.join(cleaned_lines)
         
         # Remove multiple consecutive newlines
-        while '\n\n\n' in cleaned_text:
-            cleaned_text = cleaned_text.replace('\n\n\n', '\n\n')
+        cleaned_text = MULTI_NEWLINE.sub('\n\n', cleaned_text)
         
         return cleaned_text.strip()
     
@@ -398,32 +646,28 @@ class OccamsWebScraper:
         """Save scraped data to JSON file with enhanced metadata."""
         output_file = DATA_DIR / "scraped_data.json"
         
-        # Add summary information
-        summary = {
-            'scraping_summary': {
-                'total_pages': len(self.scraped_data),
-                'total_urls_found': len(self.scraped_urls),
-                'scraping_timestamp': time.time(),
-                'base_url': self.base_url
-            },
-            'scraped_pages': self.scraped_data
-        }
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.scraped_data, f, indent=2, ensure_ascii=False)
+        # Compact orjson output: far faster than indented stdlib json, and the
+        # file is only ever read back by the chunker
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(self.scraped_data))
         
         logger.info(f"Scraped data saved to {output_file}")
         
-        # Also save a simple text summary
+        # Also save a simple text summary, built in one pass and written at once
+        summary_lines = [
+            "Web Scraping Summary",
+            "===================",
+            "",
+            f"Base URL: {self.base_url}",
+            f"Total pages scraped: {len(self.scraped_data)}",
+            "Scraped URLs:",
+            *(
+                f"{i}. {data['url']} - {data.get('title', 'No title')}"
+                for i, data in enumerate(self.scraped_data, 1)
+            )
+        ]
         summary_file = DATA_DIR / "scraping_summary.txt"
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write(f"Web Scraping Summary\n")
-            f.write(f"===================\n\n")
-            f.write(f"Base URL: {self.base_url}\n")
-            f.write(f"Total pages scraped: {len(self.scraped_data)}\n")
-            f.write(f"Scraped URLs:\n")
-            for i, data in enumerate(self.scraped_data, 1):
-                f.write(f"{i}. {data['url']} - {data.get('title', 'No title')}\n")
+        summary_file.write_text("\n".join(summary_lines) + "\n", encoding='utf-8')
 
 
 async def scrape_occams_website() -> List[Dict]:
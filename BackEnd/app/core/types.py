@@ -0,0 +1,44 @@
+"""Data types shared by the chunking and embedding pipeline."""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+import xxhash
+from numpy.typing import NDArray
+
+# Embeddings are kept as contiguous float32 arrays end to end (model output,
+# Chroma writes, scoring, MMR); rows are vectors
+FloatArray = NDArray[np.float32]
+
+
+# Slotted to keep per-chunk memory small
+@dataclass(slots=True)
+class Chunk:
+    """A piece of page text with flat attributes instead of a metadata dict."""
+
+    text: str
+    url: str
+    title: str
+    meta_description: str
+    scraped_at: Optional[float]
+    chunk_id: str
+    chunk_index: int
+    total_chunks: int
+
+    @property
+    def metadata(self) -> Dict:
+        """Metadata dict as stored alongside the chunk in ChromaDB."""
+        return {
+            'url': self.url,
+            'title': self.title,
+            'meta_description': self.meta_description,
+            'scraped_at': self.scraped_at,
+            'source': 'occams_advisory',
+            'chunk_id': self.chunk_id,
+            'chunk_index': self.chunk_index,
+            'total_chunks': self.total_chunks,
+            'chunk_size': len(self.text),
+            # Lets re-ingest skip re-embedding chunks whose text hasn't changed
+            'content_hash': xxhash.xxh64_hexdigest(self.text.encode('utf-8'))
+        }
@@ -6,7 +6,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api import chat
-from .core.rag_chain import initialize_rag_system
+from .core.rag_chain import initialize_rag_system, shutdown_rag_system
 from .tracing.langsmith_config import get_tracing_status
 from .config import API_HOST, API_PORT
 
@@ -51,6 +51,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down application...")
+    shutdown_rag_system()
 
 
 # Create FastAPI app
@@ -99,6 +100,7 @@ async def get_api_info():
                 "chat": "/api/chat",
                 "health": "/api/health", 
                 "stats": "/api/stats",
+                "dashboard": "/api/dashboard",
                 "docs": "/docs"
             },
             "features": {
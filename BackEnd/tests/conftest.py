@@ -0,0 +1,28 @@
+"""Shared pytest fixtures."""
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import Mock
+
+from app.core.rag_chain import get_rag_chain
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient for the whole session; lifespan startup and shutdown run once."""
+    # Startup would otherwise build the real RAG chain (embedding model, vector DB);
+    # the monkeypatch fixture is function-scoped, so use a context here
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr('app.main.initialize_rag_system', Mock(return_value={"status": "healthy"}))
+        with TestClient(app) as test_client:
+            yield test_client
+
+
+@pytest.fixture
+def mock_rag():
+    """A Mock RAG chain injected into the API routes in place of get_rag_chain."""
+    mock_rag_chain = Mock()
+    app.dependency_overrides[get_rag_chain] = lambda: mock_rag_chain
+    yield mock_rag_chain
+    app.dependency_overrides.pop(get_rag_chain, None)
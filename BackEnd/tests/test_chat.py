@@ -1,18 +1,17 @@
 """Tests for chat API endpoints."""
 
+import json
 import pytest
-from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
+from pydantic import ValidationError
 
-from app.main import app
-
-client = TestClient(app)
+from app.api.chat import ChatRequest
 
 
 class TestChatAPI:
     """Test cases for chat API."""
     
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, client):
         """Test root endpoint."""
         response = client.get("/")
         assert response.status_code == 200
@@ -20,7 +19,7 @@ class TestChatAPI:
         assert "message" in data
         assert "version" in data
     
-    def test_api_info_endpoint(self):
+    def test_api_info_endpoint(self, client):
         """Test API info endpoint."""
         response = client.get("/api/info")
         assert response.status_code == 200
@@ -28,16 +27,12 @@ class TestChatAPI:
         assert "api_name" in data
         assert "endpoints" in data
     
-    @patch('app.core.rag_chain.get_rag_chain')
-    def test_health_endpoint_healthy(self, mock_get_rag_chain):
+    def test_health_endpoint_healthy(self, client, mock_rag):
         """Test health endpoint when system is healthy."""
-        # Mock RAG chain
-        mock_rag_chain = Mock()
-        mock_rag_chain.health_check.return_value = {
+        mock_rag.health_check.return_value = {
             "status": "healthy",
             "vector_db_stats": {"total_documents": 100}
         }
-        mock_get_rag_chain.return_value = mock_rag_chain
         
         response = client.get("/api/health")
         assert response.status_code == 200
@@ -45,16 +40,12 @@ class TestChatAPI:
         assert data["status"] == "healthy"
         assert "vector_db_stats" in data
     
-    @patch('app.core.rag_chain.get_rag_chain')
-    def test_health_endpoint_unhealthy(self, mock_get_rag_chain):
+    def test_health_endpoint_unhealthy(self, client, mock_rag):
         """Test health endpoint when system is unhealthy."""
-        # Mock RAG chain
-        mock_rag_chain = Mock()
-        mock_rag_chain.health_check.return_value = {
+        mock_rag.health_check.return_value = {
             "status": "unhealthy",
             "error": "Database connection failed"
         }
-        mock_get_rag_chain.return_value = mock_rag_chain
         
         response = client.get("/api/health")
         assert response.status_code == 200
@@ -62,12 +53,9 @@ class TestChatAPI:
         assert data["status"] == "unhealthy"
         assert "Database connection failed" in data["message"]
     
-    @patch('app.core.rag_chain.get_rag_chain')
-    def test_chat_endpoint_success(self, mock_get_rag_chain):
+    def test_chat_endpoint_success(self, client, mock_rag):
         """Test successful chat interaction."""
-        # Mock RAG chain
-        mock_rag_chain = Mock()
-        mock_rag_chain.answer_question.return_value = {
+        mock_rag.answer_question.return_value = {
             "answer": "Occam's Advisory is a consulting firm that provides strategic advice.",
             "sources": [
                 {
@@ -78,7 +66,6 @@ class TestChatAPI:
             ],
             "context_used": True
         }
-        mock_get_rag_chain.return_value = mock_rag_chain
         
         # Test chat request
         response = client.post("/api/chat", json={
@@ -93,30 +80,97 @@ class TestChatAPI:
         assert data["context_used"] is True
         assert len(data["sources"]) > 0
     
-    def test_chat_endpoint_invalid_input(self):
-        """Test chat endpoint with invalid input."""
-        # Empty message
-        response = client.post("/api/chat", json={
-            "message": "",
+    def test_chat_stream_endpoint(self, client, mock_rag):
+        """Test streaming chat sends token events followed by sources."""
+        mock_rag.stream_answer.return_value = iter([
+            {"type": "token", "content": "Occam's "},
+            {"type": "token", "content": "Advisory"},
+            {
+                "type": "sources",
+                "sources": [
+                    {
+                        "url": "https://occamsadvisory.com/about",
+                        "title": "About Us",
+                        "score": 0.85
+                    }
+                ],
+                "context_used": True
+            }
+        ])
+        
+        response = client.post("/api/chat/stream", json={
+            "message": "What is Occam's Advisory?",
             "conversation_id": "test_conv"
         })
-        assert response.status_code == 422  # Validation error
         
-        # Message too long
-        long_message = "x" * 1001
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert "".join(e["content"] for e in events if e["type"] == "token") == "Occam's Advisory"
+        assert events[-1]["type"] == "sources"
+        assert events[-1]["conversation_id"] == "test_conv"
+    
+    def test_dashboard_endpoint(self, client, mock_rag):
+        """Test dashboard returns health and stats in one response."""
+        mock_rag.health_check.return_value = {
+            "status": "healthy",
+            "vector_db_stats": {"total_documents": 100}
+        }
+        mock_rag.embedding_manager.get_collection_stats.return_value = {"total_documents": 100}
+        mock_rag.embedding_manager.model_name = "sentence-transformers/all-MiniLM-L6-v2"
+        mock_rag.model_name = "llama-3.1-70b-versatile"
+        
+        response = client.get("/api/dashboard")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["health"]["status"] == "healthy"
+        assert data["stats"]["vector_database"]["total_documents"] == 100
+        
+        # A failing stats lookup doesn't take the health result down with it
+        mock_rag.embedding_manager.get_collection_stats.side_effect = Exception("DB Error")
+        data = client.get("/api/dashboard").json()
+        assert data["health"]["status"] == "healthy"
+        assert "error" in data["stats"]
+    
+    def test_reindex_endpoint(self, client, mock_rag):
+        """Test reindex runs the chain's reindex and reports the counts."""
+        mock_rag.reindex.return_value = {
+            "chunks_indexed": 174,
+            "vector_db_stats": {"total_documents": 174}
+        }
+        
+        response = client.post("/api/reindex")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["chunks_indexed"] == 174
+        assert data["vector_database"]["total_documents"] == 174
+        mock_rag.reindex.assert_called_once()
+    
+    def test_chat_endpoint_invalid_input(self, client, mock_rag):
+        """Test chat endpoint with invalid input."""
+        # The length limits are enforced by the request model itself
+        with pytest.raises(ValidationError):
+            ChatRequest(message="", conversation_id="test_conv")
+        
+        with pytest.raises(ValidationError):
+            ChatRequest(message="x" * 1001, conversation_id="test_conv")
+        
+        # And the endpoint turns them into a validation error response
         response = client.post("/api/chat", json={
-            "message": long_message,
+            "message": "",
             "conversation_id": "test_conv"
         })
-        assert response.status_code == 422
+        assert response.status_code == 422  # Validation error
     
-    @patch('app.core.rag_chain.get_rag_chain')
-    def test_chat_endpoint_error_handling(self, mock_get_rag_chain):
+    def test_chat_endpoint_error_handling(self, client, mock_rag):
         """Test chat endpoint error handling."""
         # Mock RAG chain to raise exception
-        mock_rag_chain = Mock()
-        mock_rag_chain.answer_question.side_effect = Exception("Test error")
-        mock_get_rag_chain.return_value = mock_rag_chain
+        mock_rag.answer_question.side_effect = Exception("Test error")
         
         response = client.post("/api/chat", json={
             "message": "Test question",
@@ -127,8 +181,7 @@ class TestChatAPI:
         data = response.json()
         assert "error" in data["detail"].lower()
     
-    @patch('app.core.rag_chain.get_rag_chain')
-    def test_stats_endpoint(self, mock_get_rag_chain):
+    def test_stats_endpoint(self, client, mock_rag):
         """Test stats endpoint."""
         # Mock RAG chain and embedding manager
         mock_embedding_manager = Mock()
@@ -138,11 +191,9 @@ class TestChatAPI:
         }
         mock_embedding_manager.model_name = "sentence-transformers/all-MiniLM-L6-v2"
         
-        mock_rag_chain = Mock()
-        mock_rag_chain.embedding_manager = mock_embedding_manager
-        mock_rag_chain.model_name = "llama-3.1-70b-versatile"
+        mock_rag.embedding_manager = mock_embedding_manager
+        mock_rag.model_name = "llama-3.1-70b-versatile"
         
-        mock_get_rag_chain.return_value = mock_rag_chain
         
         response = client.get("/api/stats")
         assert response.status_code == 200
@@ -153,27 +204,19 @@ class TestChatAPI:
         assert "llm_model" in data
 
 
-@pytest.fixture
-def mock_rag_system():
-    """Fixture for mocking RAG system components."""
-    with patch('app.core.rag_chain.initialize_rag_system') as mock_init:
-        mock_init.return_value = {"status": "healthy"}
-        yield mock_init
-
-
 class TestChatIntegration:
     """Integration tests for chat functionality."""
     
-    def test_chat_flow_integration(self, mock_rag_system):
+    @pytest.mark.skip(reason="TODO: integration test")
+    def test_chat_flow_integration(self):
         """Test complete chat flow integration."""
         # This would be an integration test that tests the complete flow
         # In a real scenario, you'd have test data and a test database
-        pass
     
-    def test_conversation_continuity(self, mock_rag_system):
+    @pytest.mark.skip(reason="TODO: integration test")
+    def test_conversation_continuity(self):
         """Test that conversation context is maintained."""
         # Test multiple messages in same conversation
-        pass
 
 
 if __name__ == "__main__":
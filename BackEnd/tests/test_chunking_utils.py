@@ -0,0 +1,93 @@
+"""Tests for text chunking utilities."""
+
+import xxhash
+
+from app.core.chunking_utils import DocumentChunker, fast_split
+from app.core.types import Chunk
+
+
+class TestFastSplit:
+    """Test cases for fast_split."""
+
+    def test_chunks_respect_max_length(self):
+        """Test that no chunk is longer than chunk_size."""
+        text = " ".join(f"word{i}" for i in range(2000)) + "\n\n" + "Sentence here. " * 200
+
+        chunks = fast_split(text, 300, 50)
+
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 300 for chunk in chunks)
+
+    def test_consecutive_chunks_overlap(self):
+        """Test that each chunk repeats the tail of the previous one."""
+        text = " ".join(f"word{i}" for i in range(500))
+
+        chunks = fast_split(text, 200, 50)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            first_word = current.split()[0]
+            assert first_word in previous.split()
+        # Every word survives the split
+        assert set(text.split()) == {word for chunk in chunks for word in chunk.split()}
+
+    def test_hard_cut_keeps_overlap(self):
+        """Test that text with no separators is cut with a character overlap."""
+        text = "".join(chr(ord('a') + i % 26) for i in range(2500))
+
+        chunks = fast_split(text, 1000, 200)
+
+        assert [len(chunk) for chunk in chunks] == [1000, 1000, 900]
+        assert chunks[0][-200:] == chunks[1][:200]
+        assert chunks[1][-200:] == chunks[2][:200]
+        assert chunks[-1].endswith(text[-100:])
+
+    def test_prefers_paragraph_breaks(self):
+        """Test that a paragraph break wins over later sentence and word breaks."""
+        first = "First paragraph has some words in it."
+        second = "Second paragraph. It keeps going with more words after it"
+        text = f"{first}\n\n{second}"
+
+        chunks = fast_split(text, 70, 0)
+
+        assert chunks[0] == first
+        assert chunks[1].startswith("Second paragraph.")
+
+    def test_prefers_sentence_over_word_breaks(self):
+        """Test that a sentence end wins over a later space."""
+        text = "A first sentence that is long enough. Then more words without a stop here"
+
+        chunks = fast_split(text, 60, 0)
+
+        assert chunks[0] == "A first sentence that is long enough."
+
+    def test_short_text_is_one_chunk(self):
+        """Test that text within chunk_size comes back whole and stripped."""
+        assert fast_split("  Short text.\n", 100, 20) == ["Short text."]
+
+    def test_empty_and_whitespace_input(self):
+        """Test that empty or blank text gives no chunks."""
+        assert fast_split("", 100, 20) == []
+        assert fast_split("   \n\n  \n", 100, 20) == []
+        assert fast_split(" " * 500, 100, 20) == []
+
+
+class TestSplitDocument:
+    """Test cases for DocumentChunker.split_document."""
+
+    def test_chunk_ids_come_from_the_url_hash(self):
+        """Test that chunk IDs are the page URL's xxhash plus the chunk index."""
+        url = "https://occamsadvisory.com/about-us"
+        chunker = DocumentChunker(chunk_size=100, chunk_overlap=0)
+        page = Chunk(
+            text="Occam's Advisory helps businesses grow. " * 10, url=url, title="About Us",
+            meta_description="", scraped_at=None, chunk_id="", chunk_index=0, total_chunks=1
+        )
+
+        chunks = chunker.split_document(page)
+
+        url_hash = xxhash.xxh64_hexdigest(url.encode('utf-8'))
+        assert len(chunks) > 1
+        assert [chunk.chunk_id for chunk in chunks] == [f"{url_hash}_{i}" for i in range(len(chunks))]
+        assert all(chunk.total_chunks == len(chunks) and chunk.url == url for chunk in chunks)
+        # The same page always gets the same IDs, so re-ingest upserts in place
+        assert [chunk.chunk_id for chunk in chunker.split_document(page)] == [chunk.chunk_id for chunk in chunks]
@@ -0,0 +1,244 @@
+"""Tests for embedding and vector database utilities."""
+
+import numpy as np
+import pytest
+from unittest.mock import Mock
+
+from app.core.chunking_utils import DocumentChunker
+from app.core.embedding_utils import EmbeddingManager, OccamsEmbeddingFunction
+from app.core.types import Chunk
+
+
+class FakeCollection:
+    """In-memory stand-in for the Chroma collection write and get calls."""
+
+    def __init__(self):
+        self.rows = {}
+        self.upserted_ids = []
+
+    def get(self, ids=None, include=None):
+        ids = [chunk_id for chunk_id in (ids or list(self.rows)) if chunk_id in self.rows]
+        return {'ids': ids, 'metadatas': [self.rows[chunk_id]['metadata'] for chunk_id in ids]}
+
+    def upsert(self, ids, documents, metadatas, embeddings=None):
+        self.upserted_ids.extend(ids)
+        for chunk_id, document, metadata in zip(ids, documents, metadatas):
+            self.rows[chunk_id] = {'document': document, 'metadata': metadata}
+
+    def update(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            self.rows[chunk_id]['metadata'] = metadata
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            del self.rows[chunk_id]
+
+
+@pytest.fixture
+def embedding_manager(monkeypatch):
+    """EmbeddingManager without a loaded model or database client."""
+    monkeypatch.setattr(EmbeddingManager, '_initialize_models', lambda self: None)
+    manager = EmbeddingManager()
+    manager.chroma_client = Mock()
+    manager.chroma_client.get_max_batch_size.return_value = 1000
+    manager.collection = FakeCollection()
+    return manager
+
+
+class TestOccamsEmbeddingFunction:
+    """Test cases for the Chroma embedding function."""
+
+    def test_build_from_config_raises(self):
+        """Test that Chroma can't silently rebuild the function from config."""
+        with pytest.raises(ValueError, match="pass it explicitly"):
+            OccamsEmbeddingFunction.build_from_config({"model_name": "model"})
+
+    def test_is_legacy_without_rebuilding(self):
+        """Test that Chroma's legacy check doesn't go through build_from_config."""
+        assert OccamsEmbeddingFunction(Mock()).is_legacy() is True
+
+
+def page_chunks(url: str, content: str):
+    """Chunks for one scraped page, split as the ingest pipeline does."""
+    chunker = DocumentChunker(chunk_size=100, chunk_overlap=0)
+    page = Chunk(
+        text=content, url=url, title="Page", meta_description="", scraped_at=None,
+        chunk_id="", chunk_index=0, total_chunks=1
+    )
+    return chunker.split_document(page)
+
+
+class TestEmbedDocuments:
+    """Test cases for embedding and storing chunks."""
+
+    def test_unchanged_chunks_are_not_reembedded(self, embedding_manager):
+        """Test that re-ingesting the same text with the same model embeds nothing."""
+        chunks = page_chunks("https://occamsadvisory.com/a", "Some page content.")
+        embedding_manager.embed_documents(chunks)
+        embedding_manager.collection.upserted_ids.clear()
+
+        embedding_manager.embed_documents(page_chunks("https://occamsadvisory.com/a", "Some page content."))
+
+        assert embedding_manager.collection.upserted_ids == []
+
+    def test_model_change_reembeds_everything(self, embedding_manager):
+        """Test that chunks stored by a different model or backend are re-embedded."""
+        chunks = page_chunks("https://occamsadvisory.com/a", "Some page content.")
+        embedding_manager.embed_documents(chunks)
+        embedding_manager.collection.upserted_ids.clear()
+
+        embedding_manager.model_signature = "other-model:torch"
+        embedding_manager.embed_documents(page_chunks("https://occamsadvisory.com/a", "Some page content."))
+
+        assert embedding_manager.collection.upserted_ids == [chunks[0].chunk_id]
+        stored = embedding_manager.collection.rows[chunks[0].chunk_id]['metadata']
+        assert stored['embedding_model'] == "other-model:torch"
+
+
+class TestEmbedDocumentStream:
+    """Test cases for streaming ingest."""
+
+    def test_prune_deletes_stale_chunks(self, embedding_manager):
+        """Test that pages which shrank or disappeared leave no chunks behind."""
+        long_page = page_chunks("https://occamsadvisory.com/a", "Long paragraph here. " * 15)
+        removed_page = page_chunks("https://occamsadvisory.com/b", "Page that goes away.")
+        assert len(long_page) > 1
+        embedding_manager.embed_document_stream(long_page + removed_page)
+
+        short_page = page_chunks("https://occamsadvisory.com/a", "Now a short page.")
+        count = embedding_manager.embed_document_stream(short_page, prune=True)
+
+        assert count == 1
+        assert list(embedding_manager.collection.rows) == [short_page[0].chunk_id]
+        assert embedding_manager.collection.rows[short_page[0].chunk_id]['document'] == "Now a short page."
+
+    def test_prune_keeps_collection_for_empty_stream(self, embedding_manager):
+        """Test that an empty stream doesn't wipe the collection."""
+        chunks = page_chunks("https://occamsadvisory.com/a", "Some page content.")
+        embedding_manager.embed_document_stream(chunks)
+
+        assert embedding_manager.embed_document_stream([], prune=True) == 0
+        assert list(embedding_manager.collection.rows) == [chunks[0].chunk_id]
+
+    def test_without_prune_only_upserts(self, embedding_manager):
+        """Test that a plain stream leaves other stored chunks alone."""
+        first = page_chunks("https://occamsadvisory.com/a", "First page content.")
+        second = page_chunks("https://occamsadvisory.com/b", "Second page content.")
+        embedding_manager.embed_document_stream(first)
+        embedding_manager.embed_document_stream(second)
+
+        assert set(embedding_manager.collection.rows) == {first[0].chunk_id, second[0].chunk_id}
+
+
+class TestWriteInBatches:
+    """Test cases for batched Chroma writes."""
+
+    def test_small_write_goes_in_one_call(self, embedding_manager):
+        """Test that a write within the max batch size isn't sliced."""
+        write = Mock()
+
+        embedding_manager._write_in_batches(write, ids=['a', 'b'], metadatas=[{}, {}])
+
+        write.assert_called_once_with(ids=['a', 'b'], metadatas=[{}, {}])
+
+    def test_large_write_is_sliced_up_front(self, embedding_manager):
+        """Test that a write above the max batch size goes out in slices."""
+        embedding_manager.chroma_client.get_max_batch_size.return_value = 2
+        write = Mock()
+
+        embedding_manager._write_in_batches(
+            write, ids=['a', 'b', 'c'], documents=['1', '2', '3'], embeddings=None
+        )
+
+        assert write.call_args_list[0].kwargs == {'ids': ['a', 'b'], 'documents': ['1', '2'], 'embeddings': None}
+        assert write.call_args_list[1].kwargs == {'ids': ['c'], 'documents': ['3'], 'embeddings': None}
+
+    def test_write_errors_propagate(self, embedding_manager):
+        """Test that a failing write is raised, not retried in slices."""
+        write = Mock(side_effect=ValueError("bad metadata"))
+
+        with pytest.raises(ValueError, match="bad metadata"):
+            embedding_manager._write_in_batches(write, ids=['a', 'b'])
+        write.assert_called_once()
+
+
+def query_results(scores, embeddings=None):
+    """A Chroma query response for one query; ip distance is 1 - score."""
+    results = {
+        'ids': [[f'id{i}' for i in range(len(scores))]],
+        'documents': [[f'Content {i}' for i in range(len(scores))]],
+        'metadatas': [[{'url': f'test{i}.com'} for i in range(len(scores))]],
+        'distances': [[1.0 - score for score in scores]]
+    }
+    if embeddings is not None:
+        results['embeddings'] = [embeddings]
+    return results
+
+
+class TestSimilaritySearch:
+    """Test cases for similarity search."""
+
+    def test_drops_results_below_threshold(self, embedding_manager):
+        """Test that results scoring below the threshold are filtered out."""
+        embedding_manager.collection = Mock()
+        embedding_manager.collection.query.return_value = query_results([0.9, 0.4, 0.75, 0.2])
+
+        results = embedding_manager.similarity_search("test query", top_k=4, score_threshold=0.5)
+
+        assert [result['content'] for result in results] == ['Content 0', 'Content 2']
+        assert [result['metadata']['url'] for result in results] == ['test0.com', 'test2.com']
+        assert results[0]['score'] == pytest.approx(0.9)
+        assert results[1]['score'] == pytest.approx(0.75)
+        assert 'embedding' not in results[0]
+        assert 'embeddings' not in embedding_manager.collection.query.call_args.kwargs['include']
+
+    def test_without_threshold_keeps_everything(self, embedding_manager):
+        """Test that every result is returned when no threshold is given."""
+        embedding_manager.collection = Mock()
+        embedding_manager.collection.query.return_value = query_results([0.9, 0.1])
+
+        results = embedding_manager.similarity_search("test query", top_k=2)
+
+        assert len(results) == 2
+        assert results[1]['score'] == pytest.approx(0.1)
+
+    def test_include_embeddings_stay_aligned(self, embedding_manager):
+        """Test that each kept result carries its own float32 embedding."""
+        embeddings = [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]]
+        embedding_manager.collection = Mock()
+        embedding_manager.collection.query.return_value = query_results([0.3, 0.8, 0.7], embeddings)
+
+        results = embedding_manager.similarity_search(
+            "test query", top_k=3, score_threshold=0.5, include_embeddings=True
+        )
+
+        assert [result['content'] for result in results] == ['Content 1', 'Content 2']
+        assert results[0]['embedding'].dtype == np.float32
+        np.testing.assert_allclose(results[0]['embedding'], [0.0, 1.0])
+        np.testing.assert_allclose(results[1]['embedding'], [0.6, 0.8])
+        assert 'embeddings' in embedding_manager.collection.query.call_args.kwargs['include']
+
+    def test_no_results(self, embedding_manager):
+        """Test that an empty query response gives no results."""
+        embedding_manager.collection = Mock()
+        embedding_manager.collection.query.return_value = query_results([])
+
+        assert embedding_manager.similarity_search("test query", score_threshold=0.5) == []
+
+    def test_unavailable_int8_index_is_not_rebuilt_per_query(self, embedding_manager, monkeypatch):
+        """Test that a failed int8 index build is remembered until the next write."""
+        monkeypatch.setattr('app.core.embedding_utils.USE_INT8_INDEX', True)
+        from_collection = Mock(return_value=None)
+        monkeypatch.setattr('app.core.embedding_utils.QuantizedIndex.from_collection', from_collection)
+        embedding_manager.collection = Mock()
+        embedding_manager.collection.query.return_value = query_results([0.9])
+
+        assert len(embedding_manager.similarity_search("first query")) == 1
+        assert len(embedding_manager.similarity_search("second query")) == 1
+        from_collection.assert_called_once()
+
+        # A write may have made the index buildable again
+        embedding_manager.collection.get.return_value = {'ids': ['stale']}
+        embedding_manager.delete_stale_chunks(set())
+        embedding_manager.similarity_search("third query")
+        assert from_collection.call_count == 2
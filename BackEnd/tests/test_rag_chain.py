@@ -1,39 +1,68 @@
 """Tests for RAG chain functionality."""
 
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from langchain.schema import Document
+from unittest.mock import Mock
 
+from app.config import SIMILARITY_THRESHOLD
 from app.core.rag_chain import OccamsRAGChain
 
 
+# Plain stand-ins for Groq completion objects; cheaper than nested Mock trees
+@dataclass
+class _Msg:
+    content: Optional[str]
+
+
+@dataclass
+class _Choice:
+    message: Optional[_Msg] = None
+    delta: Optional[_Msg] = None
+
+
+@dataclass
+class _Resp:
+    choices: List[_Choice]
+
+
+@pytest.fixture(scope="module")
+def shared_rag_chain():
+    """One OccamsRAGChain for the module, with Mock embedding manager and Groq client."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr('app.core.rag_chain.EmbeddingManager', Mock(return_value=Mock()))
+        mp.setattr('app.core.rag_chain.Groq', Mock(return_value=Mock()))
+        chain = OccamsRAGChain()
+    yield chain
+    chain.close()
+
+
+@pytest.fixture
+def rag_chain(shared_rag_chain):
+    """The shared chain with an empty retrieval cache and freshly reset mocks.
+    
+    The mocks are reachable as ``rag_chain.embedding_manager`` and
+    ``rag_chain.groq_client``.
+    """
+    shared_rag_chain.clear_cache()
+    shared_rag_chain.embedding_manager.reset_mock(return_value=True, side_effect=True)
+    shared_rag_chain.groq_client.reset_mock(return_value=True, side_effect=True)
+    return shared_rag_chain
+
+
 class TestOccamsRAGChain:
     """Test cases for OccamsRAGChain."""
     
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def setUp(self, mock_groq, mock_embedding_manager):
-        """Set up test fixtures."""
-        self.mock_embedding_manager = Mock()
-        self.mock_groq_client = Mock()
-        
-        mock_embedding_manager.return_value = self.mock_embedding_manager
-        mock_groq.return_value = self.mock_groq_client
-        
-        self.rag_chain = OccamsRAGChain()
-    
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def test_initialization(self, mock_groq, mock_embedding_manager):
+    def test_initialization(self, rag_chain):
         """Test RAG chain initialization."""
-        rag_chain = OccamsRAGChain()
-        
         assert rag_chain is not None
         assert hasattr(rag_chain, 'embedding_manager')
         assert hasattr(rag_chain, 'groq_client')
         assert hasattr(rag_chain, 'system_prompt')
     
-    def test_format_context_with_documents(self):
+    def test_format_context_with_documents(self, rag_chain):
         """Test context formatting with documents."""
         # Create test documents
         documents = [
@@ -55,11 +84,7 @@ class TestOccamsRAGChain:
             }
         ]
         
-        # Mock the RAG chain
-        with patch('app.core.rag_chain.EmbeddingManager'), \
-             patch('app.core.rag_chain.Groq'):
-            rag_chain = OccamsRAGChain()
-            context = rag_chain.format_context(documents)
+        context = rag_chain.format_context(documents)
         
         assert 'Document 1' in context
         assert 'Document 2' in context
@@ -67,21 +92,16 @@ class TestOccamsRAGChain:
         assert 'We provide strategic consulting services.' in context
         assert 'https://occamsadvisory.com/about' in context
     
-    def test_format_context_empty_documents(self):
+    def test_format_context_empty_documents(self, rag_chain):
         """Test context formatting with no documents."""
-        with patch('app.core.rag_chain.EmbeddingManager'), \
-             patch('app.core.rag_chain.Groq'):
-            rag_chain = OccamsRAGChain()
-            context = rag_chain.format_context([])
+        context = rag_chain.format_context([])
         
         assert 'No relevant information found' in context
     
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def test_retrieve_relevant_documents_success(self, mock_groq, mock_embedding_manager):
+    def test_retrieve_relevant_documents_success(self, rag_chain):
         """Test document retrieval success."""
         # Mock embedding manager
-        mock_embedding_instance = Mock()
+        mock_embedding_instance = rag_chain.embedding_manager
         mock_embedding_instance.similarity_search.return_value = [
             {
                 'content': 'Test content',
@@ -89,86 +109,126 @@ class TestOccamsRAGChain:
                 'score': 0.8
             }
         ]
-        mock_embedding_manager.return_value = mock_embedding_instance
         
-        rag_chain = OccamsRAGChain()
         results = rag_chain.retrieve_relevant_documents("test query")
         
         assert len(results) == 1
         assert results[0]['score'] == 0.8
         mock_embedding_instance.similarity_search.assert_called_once()
     
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def test_retrieve_relevant_documents_filtering(self, mock_groq, mock_embedding_manager):
+    def test_retrieve_relevant_documents_filtering(self, rag_chain):
         """Test document retrieval with similarity filtering."""
-        # Mock embedding manager with low score results
-        mock_embedding_instance = Mock()
+        # Mock embedding manager; the search itself drops low-score results
+        mock_embedding_instance = rag_chain.embedding_manager
         mock_embedding_instance.similarity_search.return_value = [
             {
                 'content': 'High relevance content',
                 'metadata': {'url': 'test1.com', 'title': 'Test 1'},
                 'score': 0.8  # Above threshold
-            },
-            {
-                'content': 'Low relevance content',
-                'metadata': {'url': 'test2.com', 'title': 'Test 2'},
-                'score': 0.5  # Below threshold
             }
         ]
-        mock_embedding_manager.return_value = mock_embedding_instance
         
-        rag_chain = OccamsRAGChain()
         results = rag_chain.retrieve_relevant_documents("test query")
         
-        # Should only return documents above similarity threshold
+        # Should ask the search for documents above the similarity threshold
+        _, kwargs = mock_embedding_instance.similarity_search.call_args
+        assert kwargs['score_threshold'] == SIMILARITY_THRESHOLD
         assert len(results) == 1
         assert results[0]['score'] == 0.8
     
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def test_generate_response_success(self, mock_groq, mock_embedding_manager):
-        """Test response generation success."""
-        # Mock Groq client
-        mock_response = Mock()
-        mock_response.choices = [Mock()]
-        mock_response.choices[0].message.content = "Generated response"
+    def test_retrieve_relevant_documents_mmr(self, rag_chain, monkeypatch):
+        """Test MMR keeps MMR_TOP_K diverse documents and drops near-duplicates."""
+        monkeypatch.setattr('app.core.rag_chain.ENABLE_MMR', True)
+        scores = [0.9, 0.89, 0.6, 0.55, 0.5, 0.45]
+        embeddings = np.eye(6, dtype=np.float32)
+        embeddings[1] = embeddings[0]  # document 1 duplicates document 0
+        
+        rag_chain.embedding_manager.similarity_search.return_value = [
+            {
+                'content': f'Content {i}',
+                'metadata': {'url': f'test{i}.com', 'title': f'Test {i}'},
+                'score': score,
+                'embedding': embeddings[i]
+            }
+            for i, score in enumerate(scores)
+        ]
         
-        mock_groq_instance = Mock()
-        mock_groq_instance.chat.completions.create.return_value = mock_response
-        mock_groq.return_value = mock_groq_instance
+        results = rag_chain.retrieve_relevant_documents("test query")
         
-        mock_embedding_manager.return_value = Mock()
+        assert [r['content'] for r in results] == ['Content 0', 'Content 2', 'Content 3', 'Content 4']
+        assert all('embedding' not in r for r in results)
+    
+    def test_retrieve_relevant_documents_cached(self, rag_chain):
+        """Test that repeated queries are served from the retrieval cache."""
+        mock_embedding_instance = rag_chain.embedding_manager
+        mock_embedding_instance.similarity_search.return_value = [
+            {
+                'content': 'Test content',
+                'metadata': {'url': 'test.com', 'title': 'Test'},
+                'score': 0.8
+            }
+        ]
+        
+        first = rag_chain.retrieve_relevant_documents("What is Occam's Advisory?")
+        second = rag_chain.retrieve_relevant_documents("  what is occam's advisory?  ")
+        
+        assert first == second
+        mock_embedding_instance.similarity_search.assert_called_once()
+        # The search gets the stripped query with its case intact
+        assert mock_embedding_instance.similarity_search.call_args.kwargs['query'] == "What is Occam's Advisory?"
+        
+        # Clearing the cache forces a fresh search
+        rag_chain.clear_cache()
+        rag_chain.retrieve_relevant_documents("What is Occam's Advisory?")
+        assert mock_embedding_instance.similarity_search.call_count == 2
+    
+    def test_generate_response_success(self, rag_chain):
+        """Test response generation success."""
+        # Mock Groq client
+        mock_groq_instance = rag_chain.groq_client
+        mock_groq_instance.chat.completions.create.return_value = _Resp([_Choice(_Msg("Generated response"))])
         
-        rag_chain = OccamsRAGChain()
         response = rag_chain.generate_response("test query", "test context")
         
         assert response == "Generated response"
         mock_groq_instance.chat.completions.create.assert_called_once()
+        
+        # Static rules go in the system message, context and query in the user message
+        messages = mock_groq_instance.chat.completions.create.call_args.kwargs['messages']
+        assert messages[0] == {"role": "system", "content": rag_chain.system_prompt}
+        assert messages[1]["role"] == "user"
+        assert "test context" in messages[1]["content"]
+        assert "test query" in messages[1]["content"]
     
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def test_generate_response_error_handling(self, mock_groq, mock_embedding_manager):
+    def test_generate_response_error_handling(self, rag_chain):
         """Test response generation error handling."""
         # Mock Groq client to raise exception
-        mock_groq_instance = Mock()
-        mock_groq_instance.chat.completions.create.side_effect = Exception("API Error")
-        mock_groq.return_value = mock_groq_instance
-        
-        mock_embedding_manager.return_value = Mock()
+        rag_chain.groq_client.chat.completions.create.side_effect = Exception("API Error")
         
-        rag_chain = OccamsRAGChain()
         response = rag_chain.generate_response("test query", "test context")
         
         assert "trouble generating a response" in response
     
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def test_answer_question_complete_flow(self, mock_groq, mock_embedding_manager):
+    def test_stream_response_success(self, rag_chain):
+        """Test streaming response generation."""
+        # Mock Groq stream chunks
+        chunks = [
+            _Resp([_Choice(delta=_Msg(token))])
+            for token in ["Occam's ", None, "Advisory"]
+        ]
+        
+        mock_groq_instance = rag_chain.groq_client
+        mock_groq_instance.chat.completions.create.return_value = iter(chunks)
+        
+        tokens = list(rag_chain.stream_response("test query", "test context"))
+        
+        assert tokens == ["Occam's ", "Advisory"]
+        assert mock_groq_instance.chat.completions.create.call_args.kwargs["stream"] is True
+    
+    def test_answer_question_complete_flow(self, rag_chain):
         """Test complete question answering flow."""
         # Mock embedding manager
-        mock_embedding_instance = Mock()
-        mock_embedding_instance.similarity_search.return_value = [
+        rag_chain.embedding_manager.similarity_search.return_value = [
             {
                 'content': 'Occam\'s Advisory provides consulting services.',
                 'metadata': {
@@ -178,18 +238,12 @@ class TestOccamsRAGChain:
                 'score': 0.9
             }
         ]
-        mock_embedding_manager.return_value = mock_embedding_instance
         
         # Mock Groq client
-        mock_response = Mock()
-        mock_response.choices = [Mock()]
-        mock_response.choices[0].message.content = "Occam's Advisory is a consulting firm that provides strategic advice to businesses."
-        
-        mock_groq_instance = Mock()
-        mock_groq_instance.chat.completions.create.return_value = mock_response
-        mock_groq.return_value = mock_groq_instance
+        rag_chain.groq_client.chat.completions.create.return_value = _Resp([
+            _Choice(_Msg("Occam's Advisory is a consulting firm that provides strategic advice to businesses."))
+        ])
         
-        rag_chain = OccamsRAGChain()
         result = rag_chain.answer_question("What is Occam's Advisory?")
         
         assert "answer" in result
@@ -199,56 +253,30 @@ class TestOccamsRAGChain:
         assert len(result["sources"]) == 1
         assert result["sources"][0]["url"] == "https://occamsadvisory.com/services"
     
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def test_health_check_healthy(self, mock_groq, mock_embedding_manager):
+    def test_health_check_healthy(self, rag_chain):
         """Test health check when system is healthy."""
         # Mock embedding manager
-        mock_embedding_instance = Mock()
+        mock_embedding_instance = rag_chain.embedding_manager
         mock_embedding_instance.get_collection_stats.return_value = {
             "total_documents": 100,
             "collection_name": "occams_advisory"
         }
-        mock_embedding_manager.return_value = mock_embedding_instance
-        
-        # Mock successful answer generation
-        mock_groq_instance = Mock()
-        mock_response = Mock()
-        mock_response.choices = [Mock()]
-        mock_response.choices[0].message.content = "Test response"
-        mock_groq_instance.chat.completions.create.return_value = mock_response
-        mock_groq.return_value = mock_groq_instance
-        
-        rag_chain = OccamsRAGChain()
-        
-        # Mock the retrieve method to avoid actual retrieval
-        with patch.object(rag_chain, 'retrieve_relevant_documents') as mock_retrieve:
-            mock_retrieve.return_value = [
-                {
-                    'content': 'Test content',
-                    'metadata': {'url': 'test.com', 'title': 'Test'},
-                    'score': 0.8
-                }
-            ]
-            
-            health = rag_chain.health_check()
+        # Probe query finds a document
+        mock_embedding_instance.health_probe.return_value = 1
+        
+        health = rag_chain.health_check()
         
         assert health["status"] == "healthy"
         assert "vector_db_stats" in health
         assert health["test_query_successful"] is True
+        # Health checks must not spend LLM tokens
+        rag_chain.groq_client.chat.completions.create.assert_not_called()
     
-    @patch('app.core.rag_chain.EmbeddingManager')
-    @patch('app.core.rag_chain.Groq')
-    def test_health_check_unhealthy(self, mock_groq, mock_embedding_manager):
+    def test_health_check_unhealthy(self, rag_chain):
         """Test health check when system is unhealthy."""
         # Mock embedding manager to raise exception
-        mock_embedding_instance = Mock()
-        mock_embedding_instance.get_collection_stats.side_effect = Exception("DB Error")
-        mock_embedding_manager.return_value = mock_embedding_instance
-        
-        mock_groq.return_value = Mock()
+        rag_chain.embedding_manager.get_collection_stats.side_effect = Exception("DB Error")
         
-        rag_chain = OccamsRAGChain()
         health = rag_chain.health_check()
         
         assert health["status"] == "unhealthy"
@@ -258,14 +286,13 @@ class TestOccamsRAGChain:
 class TestRAGChainHelpers:
     """Test helper functions in RAG chain module."""
     
-    @patch('app.core.rag_chain.OccamsRAGChain')
-    def test_get_rag_chain_singleton(self, mock_rag_chain_class):
+    def test_get_rag_chain_singleton(self, monkeypatch):
         """Test that get_rag_chain returns singleton instance."""
         from app.core.rag_chain import get_rag_chain
         
+        monkeypatch.setattr('app.core.rag_chain.OccamsRAGChain', Mock())
         # Reset global variable
-        import app.core.rag_chain as rag_module
-        rag_module.rag_chain = None
+        monkeypatch.setattr('app.core.rag_chain.rag_chain', None)
         
         # First call should create instance
         chain1 = get_rag_chain()
@@ -275,28 +302,29 @@ class TestRAGChainHelpers:
         chain2 = get_rag_chain()
         assert chain1 is chain2
     
-    @patch('app.core.rag_chain.get_rag_chain')
-    def test_initialize_rag_system_success(self, mock_get_rag_chain):
+    def test_initialize_rag_system_success(self, monkeypatch):
         """Test successful RAG system initialization."""
         from app.core.rag_chain import initialize_rag_system
         
         # Mock RAG chain
         mock_chain = Mock()
         mock_chain.health_check.return_value = {"status": "healthy", "vector_db_stats": {}}
-        mock_get_rag_chain.return_value = mock_chain
+        monkeypatch.setattr('app.core.rag_chain.get_rag_chain', Mock(return_value=mock_chain))
         
         result = initialize_rag_system()
         
         assert result["status"] == "healthy"
         mock_chain.health_check.assert_called_once()
     
-    @patch('app.core.rag_chain.get_rag_chain')
-    def test_initialize_rag_system_failure(self, mock_get_rag_chain):
+    def test_initialize_rag_system_failure(self, monkeypatch):
         """Test RAG system initialization failure."""
         from app.core.rag_chain import initialize_rag_system
         
         # Mock RAG chain to raise exception
-        mock_get_rag_chain.side_effect = Exception("Initialization failed")
+        monkeypatch.setattr(
+            'app.core.rag_chain.get_rag_chain',
+            Mock(side_effect=Exception("Initialization failed"))
+        )
         
         result = initialize_rag_system()
         
@@ -0,0 +1,134 @@
+"""Tests for web scraping utilities."""
+
+import asyncio
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+
+from app.core.scrapping_utils import OccamsWebScraper
+
+
+@pytest.fixture
+def scraper():
+    """A scraper that is never started; tests drive its helpers directly."""
+    return OccamsWebScraper("https://occamsadvisory.com")
+
+
+class TestPageExtraction:
+    """Test cases for page text extraction."""
+
+    def test_inline_markup_stays_on_its_line(self, scraper):
+        """Test that inline elements don't split lines or drop short words."""
+        html = """<html><head><title>Contact</title></head><body>
+        <nav>Home</nav>
+        <main>
+            <p>Contact <a href="/contact">us</a> at <b>(555)</b> 123-4567 or visit our
+               <strong>New York</strong> office.</p>
+            <p>We are an <i>ERC</i> firm, <span>LLC</span>.</p>
+            <ul><li>Tax <em>credits</em></li><li>Advisory services</li></ul>
+        </main>
+        </body></html>"""
+
+        page = scraper._extract_page_data("https://occamsadvisory.com/contact", html)
+
+        assert page["content"] == (
+            "Contact us at (555) 123-4567 or visit our New York office.\n"
+            "We are an ERC firm, LLC.\n"
+            "Tax credits\n"
+            "Advisory services"
+        )
+        assert page["title"] == "Contact"
+
+    def test_thin_page_is_skipped(self, scraper):
+        """Test that pages with too little text are discarded."""
+        html = "<html><body><main><p>Too short</p></main></body></html>"
+
+        assert scraper._extract_page_data("https://occamsadvisory.com/", html) is None
+
+
+class FakeRequest:
+    """Navigation request for the fake page's main frame."""
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def is_navigation_request(self):
+        return True
+
+
+class FakeResponse:
+    """Response with just the fields _load_page reads."""
+
+    def __init__(self, status, content_type, frame):
+        self.status = status
+        self.headers = {'content-type': content_type} if content_type else {}
+        self.request = FakeRequest(frame)
+
+
+class FakePage:
+    """Page whose goto replays a chain of navigation responses.
+
+    As in the browser, calling window.stop() while a navigation is still
+    loading aborts it with net::ERR_ABORTED.
+    """
+
+    def __init__(self, hops):
+        self.main_frame = object()
+        self.hops = hops
+        self.listeners = []
+        self.stopped = False
+
+    def on(self, event, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, event, callback):
+        self.listeners.remove(callback)
+
+    async def evaluate(self, script):
+        if script == "window.stop()":
+            self.stopped = True
+
+    async def goto(self, url, wait_until=None):
+        for status, content_type in self.hops:
+            response = FakeResponse(status, content_type, self.main_frame)
+            for callback in list(self.listeners):
+                await callback(response)
+            if self.stopped:
+                raise PlaywrightError(f"net::ERR_ABORTED at {url}")
+        return response
+
+    async def wait_for_selector(self, selector, timeout=None):
+        return None
+
+
+class TestLoadPage:
+    """Test cases for page navigation."""
+
+    def test_redirect_is_followed(self, scraper):
+        """Test that a redirect hop without a content type isn't stopped."""
+        page = FakePage([(301, None), (200, 'text/html; charset=utf-8')])
+
+        response = asyncio.run(scraper._load_page(page, "http://occamsadvisory.com"))
+
+        assert not page.stopped
+        assert response.status == 200
+        assert scraper._is_html(response)
+
+    def test_non_html_is_stopped_and_returned(self, scraper):
+        """Test that a PDF is stopped and its response returned, not raised."""
+        page = FakePage([(200, 'application/pdf')])
+
+        response = asyncio.run(scraper._load_page(page, "https://occamsadvisory.com/brochure"))
+
+        assert page.stopped
+        assert response.status == 200
+        assert not scraper._is_html(response)
+
+    def test_redirect_to_non_html_is_stopped(self, scraper):
+        """Test that the final non-HTML response of a redirect chain is stopped."""
+        page = FakePage([(302, 'text/plain'), (200, 'application/pdf')])
+
+        response = asyncio.run(scraper._load_page(page, "https://occamsadvisory.com/download"))
+
+        assert page.stopped
+        assert response.headers['content-type'] == 'application/pdf'
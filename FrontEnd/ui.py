@@ -1,63 +1,214 @@
 """Streamlit frontend for Occam's Advisory RAG Chatbot."""
 
+from __future__ import annotations
+
+import logging
+import os
+import re
+import string
+import httpx
 import streamlit as st
-import requests
 import time
-from typing import Dict, List
-import json
+from typing import TYPE_CHECKING
+import orjson
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterator
 
 # Configuration
+DEBUG = os.getenv("OCCAMS_UI_DEBUG") == "1"
 API_BASE_URL = "http://127.0.0.1:8080/api"
-CHAT_ENDPOINT = f"{API_BASE_URL}/chat"
-HEALTH_ENDPOINT = f"{API_BASE_URL}/health"
-STATS_ENDPOINT = f"{API_BASE_URL}/stats"
+# Endpoint paths, relative to API_BASE_URL
+CHAT_STREAM_ENDPOINT = "/chat/stream"
+HEALTH_ENDPOINT = "/health"
+STATS_ENDPOINT = "/stats"
+DASHBOARD_ENDPOINT = "/dashboard"
+
+logger = logging.getLogger(__name__)
+if DEBUG:
+    # Nothing else configures logging in the UI process
+    logging.basicConfig(level=logging.INFO)
+    logger.setLevel(logging.DEBUG)
+
+
+@st.cache_resource
+def get_http_client() -> httpx.Client:
+    """Shared pooled HTTP client, so reruns reuse keep-alive connections to the API."""
+    return httpx.Client(
+        base_url=API_BASE_URL,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=4)
+    )
 
 
+# Streamlit reruns the script on every interaction; cache the sidebar calls
+# so they don't add two blocking round-trips to each rerun
+@st.cache_data(ttl=30)
 def check_api_health() -> Dict:
     """Check if the API is healthy."""
     try:
-        response = requests.get(HEALTH_ENDPOINT, timeout=5)
-        return response.json()
+        response = get_http_client().get(HEALTH_ENDPOINT, timeout=5)
+        return orjson.loads(response.content)
     except Exception as e:
         return {"status": "unhealthy", "message": str(e)}
 
 
+@st.cache_data(ttl=60)
 def get_system_stats() -> Dict:
     """Get system statistics."""
     try:
-        response = requests.get(STATS_ENDPOINT, timeout=5)
-        return response.json()
+        response = get_http_client().get(STATS_ENDPOINT, timeout=5)
+        return orjson.loads(response.content)
     except Exception as e:
         return {"error": str(e)}
 
 
-def send_chat_message(message: str) -> Dict:
-    """Send chat message to API."""
+@st.cache_data(ttl=30)
+def get_dashboard() -> Dict:
+    """Get health and statistics in one call, falling back to the separate endpoints."""
     try:
-        payload = {
-            "message": message,
-            "conversation_id": st.session_state.get("conversation_id", "")
-        }
-        print(f"Sending payload: {payload}")  # DEBUG
-        response = requests.post(
-            CHAT_ENDPOINT,
-            json=payload,
-            timeout=30
-        )
-        
-        print(f"Response status: {response.status_code}")  # DEBUG
-        print(f"Response text: {response.text}")  # DEBUG
-        
+        response = get_http_client().get(DASHBOARD_ENDPOINT, timeout=5)
         if response.status_code == 200:
-            return response.json()
-        else:
-            return {
-                "error": f"API Error: {response.status_code}",
-                "details": response.text
-            }
+            return orjson.loads(response.content)
+    except Exception:
+        pass
+    return {"health": check_api_health(), "stats": get_system_stats()}
+
+
+def stream_chat_message(message: str, result: Dict) -> Iterator[str]:
+    """Send chat message to the streaming API, yielding answer tokens as they arrive.
+    
+    The sources from the final event are stored in ``result``, as is any error.
+    """
+    payload = {
+        "message": message,
+        "conversation_id": st.session_state.get("conversation_id", "")
+    }
+    if DEBUG:
+        logger.debug(f"Sending payload: {payload}")
+    
+    try:
+        with get_http_client().stream(
+            "POST",
+            CHAT_STREAM_ENDPOINT,
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"}
+        ) as response:
+            if DEBUG:
+                logger.debug(f"Response status: {response.status_code}")
             
+            if response.status_code != 200:
+                result["error"] = f"API Error: {response.status_code}"
+                result["details"] = response.read().decode(errors="replace")
+                return
+            
+            # Server-sent events: "token" events, then one "sources" event
+            for line in response.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = orjson.loads(line.removeprefix("data: "))
+                if event["type"] == "token":
+                    yield event["content"]
+                elif event["type"] == "sources":
+                    result["sources"] = event.get("sources", [])
+                elif event["type"] == "error":
+                    result["error"] = event.get("message", "Unknown error")
+                    
     except Exception as e:
-        return {"error": str(e)}
+        result["error"] = str(e)
+
+
+CUSTOM_CSS = """
+<style>
+.main-header {
+    text-align: center;
+    padding: 1rem 0;
+    background: linear-gradient(90deg, #1f4e79, #2e8b57);
+    color: white;
+    border-radius: 10px;
+    margin-bottom: 2rem;
+}
+
+.chat-message {
+    padding: 1rem;
+    margin: 0.5rem 0;
+    border-radius: 10px;
+    border-left: 4px solid #1f4e79;
+}
+
+.user-message {
+    background-color: #e3f2fd;
+    border-left-color: #2196f3;
+    color: black;
+}
+
+.assistant-message {
+    background-color: #f3e5f5;
+    border-left-color: #9c27b0;
+    color: black;
+}
+
+.source-item {
+    background-color: #f5f5f5;
+    padding: 0.5rem;
+    margin: 0.2rem 0;
+    border-radius: 5px;
+    font-size: 0.8rem;
+    color: black;
+}
+
+.status-healthy {
+    color: #4caf50;
+    font-weight: bold;
+}
+
+.status-unhealthy {
+    color: #f44336;
+    font-weight: bold;
+}
+</style>
+"""
+
+
+@st.cache_resource
+def get_custom_css() -> str:
+    """The custom CSS with whitespace collapsed, built once per server process."""
+    return re.sub(r"\s+", " ", CUSTOM_CSS).strip()
+
+
+SOURCE_TEMPLATE = string.Template(
+    '<div class="source-item">$i. <a href="$url" target="_blank">$title</a> (Relevance: $score)</div>'
+)
+
+
+def message_html(message: Dict) -> str:
+    """Build the HTML for one chat message, including its sources."""
+    if message["role"] == "user":
+        return (
+            '<div class="chat-message user-message">'
+            f'<strong>You:</strong> {message["content"]}</div>'
+        )
+    
+    html = (
+        '<div class="chat-message assistant-message">'
+        f'<strong>Assistant:</strong> {message["content"]}</div>'
+    )
+    if message.get("sources"):
+        # Sources start their own block, after a blank line, for the same
+        # reason messages are separated in the history
+        html += "\n\n<p><strong>Sources:</strong></p>" + "".join(
+            SOURCE_TEMPLATE.substitute(
+                i=i, url=source["url"], title=source["title"], score=f'{source["score"]:.2f}'
+            )
+            for i, source in enumerate(message["sources"], 1)
+        )
+    return html
+
+
+def add_message(message: Dict):
+    """Append a message to the chat history with its HTML rendered once."""
+    message["_html"] = message_html(message)
+    st.session_state.messages.append(message)
 
 
 def initialize_session_state():
@@ -85,56 +236,7 @@ def main():
     initialize_session_state()
     
     # Custom CSS
-    st.markdown("""
-    <style>
-    .main-header {
-        text-align: center;
-        padding: 1rem 0;
-        background: linear-gradient(90deg, #1f4e79, #2e8b57);
-        color: white;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-    }
-    
-    .chat-message {
-        padding: 1rem;
-        margin: 0.5rem 0;
-        border-radius: 10px;
-        border-left: 4px solid #1f4e79;
-    }
-    
-    .user-message {
-        background-color: #e3f2fd;
-        border-left-color: #2196f3;
-        color: black;
-    }
-    
-    .assistant-message {
-        background-color: #f3e5f5;
-        border-left-color: #9c27b0;
-        color: black;
-    }
-    
-    .source-item {
-        background-color: #f5f5f5;
-        padding: 0.5rem;
-        margin: 0.2rem 0;
-        border-radius: 5px;
-        font-size: 0.8rem;
-        color: black;
-    }
-    
-    .status-healthy {
-        color: #4caf50;
-        font-weight: bold;
-    }
-    
-    .status-unhealthy {
-        color: #f44336;
-        font-weight: bold;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.html(get_custom_css())
     
     # Header
     st.markdown("""
@@ -148,8 +250,14 @@ def main():
     with st.sidebar:
         st.header("System Status")
         
-        # Check API health
-        health_status = check_api_health()
+        if st.button("🔄 Refresh"):
+            get_dashboard.clear()
+            check_api_health.clear()
+            get_system_stats.clear()
+        
+        # Check API health and fetch stats in one request
+        dashboard = get_dashboard()
+        health_status = dashboard["health"]
         
         if health_status["status"] == "healthy":
             st.markdown('<p class="status-healthy">✅ System Healthy</p>', unsafe_allow_html=True)
@@ -162,7 +270,7 @@ def main():
         # System Statistics
         if st.session_state.api_healthy:
             st.subheader("System Info")
-            stats = get_system_stats()
+            stats = dashboard["stats"]
             
             if "error" not in stats:
                 st.metric("Documents in DB", stats.get("vector_database", {}).get("total_documents", "N/A"))
@@ -200,82 +308,59 @@ def main():
     chat_container = st.container()
     
     with chat_container:
-        # Display existing messages
-        for message in st.session_state.messages:
-            if message["role"] == "user":
-                st.markdown(f"""
-                <div class="chat-message user-message">
-                    <strong>You:</strong> {message["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div class="chat-message assistant-message">
-                    <strong>Assistant:</strong> {message["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Display sources if available
-                if "sources" in message and message["sources"]:
-                    st.markdown("**Sources:**")
-                    for i, source in enumerate(message["sources"], 1):
-                        st.markdown(f"""
-                        <div class="source-item">
-                            {i}. <a href="{source["url"]}" target="_blank">{source["title"]}</a> 
-                            (Relevance: {source["score"]:.2f})
-                        </div>
-                        """, unsafe_allow_html=True)
+        # Display existing messages in a single markdown element rather
+        # than one per message and source; each was rendered when added.
+        # The blank lines keep each message its own block, so markdown in one
+        # answer (e.g. a trailing list) can't swallow the next message's HTML
+        if st.session_state.messages:
+            st.markdown(
+                "\n\n".join(message["_html"] for message in st.session_state.messages),
+                unsafe_allow_html=True
+            )
     
     # Chat input
     if prompt := st.chat_input("Ask me about Occam's Advisory..."):
         # Add user message to chat
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        user_message = {"role": "user", "content": prompt}
+        add_message(user_message)
         
         # Display user message immediately
         with chat_container:
-            st.markdown(f"""
-            <div class="chat-message user-message">
-                <strong>You:</strong> {prompt}
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(user_message["_html"], unsafe_allow_html=True)
+        
+        # Stream the answer as it is generated, then swap in the styled message
+        response = {}
+        with chat_container:
+            placeholder = st.empty()
+            with placeholder:
+                answer = st.write_stream(stream_chat_message(prompt, response))
         
-        # Show thinking indicator
-        with st.spinner("Thinking..."):
-            # Send message to API
-            response = send_chat_message(prompt)
+        # write_stream returns a list rather than a string when nothing was streamed
+        if not isinstance(answer, str):
+            answer = "".join(answer)
+        if not answer.strip() and "error" not in response:
+            response["error"] = "No response received from the API"
         
         # Handle response
         if "error" in response:
+            placeholder.empty()
             error_msg = f"Sorry, I encountered an error: {response['error']}"
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
+            add_message({"role": "assistant", "content": error_msg})
             st.error(error_msg)
         else:
             # Add assistant response to chat
             assistant_message = {
                 "role": "assistant",
-                "content": response["answer"],
+                "content": answer,
                 "sources": response.get("sources", [])
             }
-            st.session_state.messages.append(assistant_message)
+            add_message(assistant_message)
             
-            # Display assistant response
-            with chat_container:
-                st.markdown(f"""
-                <div class="chat-message assistant-message">
-                    <strong>Assistant:</strong> {response["answer"]}
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Display sources
-                if response.get("sources"):
-                    st.markdown("**Sources:**")
-                    for i, source in enumerate(response["sources"][:5], 1):
-                        st.markdown(f"""
-                        <div class="source-item">
-                            {i}. <a href="{source["url"]}" target="_blank">{source["title"]}</a> 
-                            (Relevance: {source["score"]:.2f})
-                        </div>
-                        """, unsafe_allow_html=True)
+            # Display assistant response with its top sources
+            placeholder.markdown(
+                message_html({**assistant_message, "sources": assistant_message["sources"][:5]}),
+                unsafe_allow_html=True
+            )
         
         # Rerun to update the display
         # st.rerun()